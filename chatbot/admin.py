@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import ChatSession
 
-# Register your models here.
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'updated_at')
+    readonly_fields = ('session_id', 'data', 'updated_at')
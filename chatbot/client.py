@@ -0,0 +1,124 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while the chat service is considered down."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; while open every call fails fast.
+    After `reset_timeout` seconds one trial call is let through (half-open): success closes
+    the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"⚠️ Chat service circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class BotClient:
+    """
+    Shared client for the FastAPI chat service: keep-alive connection pool, retries with
+    backoff on connection errors (never on a request that may have reached the service),
+    and a circuit breaker so a dead service fails requests immediately.
+    """
+
+    # Gateway errors mean the service itself is unavailable
+    FAILURE_STATUSES = {502, 503, 504}
+
+    def __init__(self, base_url: str, pool_size: int = 20, connect_timeout: float = 2,
+                 read_timeout: float = 30, retries: int = 2, breaker: CircuitBreaker = None):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=0.2)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, path: str, read_timeout: float = None, **kwargs) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Chat service at {self.base_url} is unavailable (circuit open)")
+        # Every outcome is recorded, so a half-open trial always clears (any exception counts as a failure)
+        healthy = False
+        try:
+            response = self.session.post(
+                url, timeout=(self.connect_timeout, read_timeout or self.read_timeout),
+                allow_redirects=False, **kwargs
+            )
+            healthy = response.status_code not in self.FAILURE_STATUSES
+        finally:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_bot_client() -> BotClient:
+    """Process-wide BotClient built from the FASTAPI_* settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BotClient(
+                    settings.FASTAPI_URL,
+                    pool_size=settings.FASTAPI_POOL_SIZE,
+                    connect_timeout=settings.FASTAPI_CONNECT_TIMEOUT,
+                    read_timeout=settings.FASTAPI_READ_TIMEOUT,
+                    retries=settings.FASTAPI_RETRIES,
+                    breaker=CircuitBreaker(settings.FASTAPI_BREAKER_THRESHOLD, settings.FASTAPI_BREAKER_RESET_SECONDS),
+                )
+    return _client
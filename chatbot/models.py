@@ -1,3 +1,11 @@
 from django.db import models
 
-# Create your models here.
+
+class ChatSession(models.Model):
+    """Conversation context of the chat assistant (last search, last added item, ...)."""
+    session_id = models.CharField(max_length=100, primary_key=True)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.session_id
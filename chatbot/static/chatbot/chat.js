@@ -78,8 +78,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
             const sessionId = getOrCreateSession();
 
-            // Send to Backend
-            fetch('/chat/send/', {
+            // Send to Backend (answer streamed section by section)
+            fetch('/chat/stream/', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -87,10 +87,16 @@ document.addEventListener('DOMContentLoaded', function () {
                 },
                 body: JSON.stringify({ message: message, session_id: sessionId })
             })
-                .then(response => response.json())
-                .then(data => {
-                    const botResponse = data.response || data.error || "Sorry, I couldn't understand that.";
-                    addMessage(botResponse, 'bot');
+                .then(response => {
+                    const contentType = response.headers.get('content-type') || '';
+                    if (contentType.includes('text/event-stream') && response.body) {
+                        return readStream(response);
+                    }
+                    // Login prompt and errors come back as plain JSON
+                    return response.json().then(data => {
+                        const botResponse = data.response || data.error || "Sorry, I couldn't understand that.";
+                        addMessage(botResponse, 'bot');
+                    });
                 })
                 .catch(error => {
                     addMessage("Error connecting to server.", 'bot');
@@ -249,6 +255,52 @@ document.addEventListener('DOMContentLoaded', function () {
                 console.error("Storage error", e);
             }
         }
+        return messageDiv;
+    }
+
+    async function readStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let messageDiv = null;
+
+        function handleEvent(raw) {
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) return;
+            const payload = JSON.parse(data);
+
+            if (event === 'section') {
+                text += payload.text;
+                if (!messageDiv) {
+                    messageDiv = addMessage(text, 'bot', false);
+                } else {
+                    messageDiv.innerHTML = formatMessage(text);
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                }
+            } else if (event === 'done') {
+                if (text) saveMessage(text, 'bot');
+            } else if (event === 'error') {
+                addMessage(payload.error || "Sorry, I couldn't understand that.", 'bot');
+            }
+        }
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+        }
+        if (buffer.trim()) handleEvent(buffer);
     }
 
     function saveMessage(text, sender) {
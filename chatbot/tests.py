@@ -1,3 +1,198 @@
-from django.test import TestCase
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from chatbot_api.app.batching import MicroBatcher
+from chatbot_api.app.catalog_index import CatalogIndex
+from chatbot_api.app.pharmacy_bot import PharmacyBot
+from store.catalog import bump_catalog_version
+from store.models import CartItem, Medicine
+
+from .client import BotClient, CircuitBreaker, CircuitOpenError
+
+
+class BotClientCircuitTests(SimpleTestCase):
+    def make_client(self):
+        # reset_timeout=0: an open circuit is immediately half-open
+        return BotClient("http://bot.test", retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+
+    def response(self, status):
+        response = requests.Response()
+        response.status_code = status
+        return response
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        client = BotClient("http://bot.test", retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        with mock.patch.object(client.session, "post", side_effect=requests.exceptions.ConnectionError) as post:
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    client.post("/chat")
+            with self.assertRaises(CircuitOpenError):
+                client.post("/chat")
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(client.breaker.state, "open")
+
+    def test_gateway_errors_count_as_failures(self):
+        client = self.make_client()
+        with mock.patch.object(client.session, "post", return_value=self.response(503)):
+            client.post("/chat")
+        self.assertIsNotNone(client.breaker.opened_at)
+
+    def test_failed_trial_with_any_request_error_clears_the_trial(self):
+        client = self.make_client()
+        client.breaker.record_failure()
+        with mock.patch.object(client.session, "post", side_effect=requests.exceptions.ChunkedEncodingError):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                client.post("/chat")
+        self.assertFalse(client.breaker._trial_in_flight)
+
+        # The next trial goes through and closes the circuit
+        with mock.patch.object(client.session, "post", return_value=self.response(200)):
+            client.post("/chat")
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_only_one_trial_while_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+
+class CatalogIndexFreshnessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("2.50"), category="Painkiller")
+        self.index = CatalogIndex(refresh_interval=0, check_interval=0)
+
+    def edit_in_another_process(self, **fields):
+        # No signals reach this process, only the shared catalog version
+        Medicine.objects.filter(pk=self.medicine.pk).update(**fields)
+        bump_catalog_version()
+
+    def test_reloads_when_the_catalog_version_changes(self):
+        self.edit_in_another_process(price=Decimal("3.10"))
+        self.assertEqual(self.index.get(self.medicine.pk).price, Decimal("3.10"))
+
+    def test_unchanged_version_skips_the_reload(self):
+        with self.assertNumQueries(0):
+            self.index.get(self.medicine.pk)
+
+    def test_only_one_caller_rebuilds(self):
+        self.edit_in_another_process(name="Acetaminophen")
+        self.index._rebuild_lock.acquire()
+        try:
+            # A rebuild is already under way: serve the current snapshot instead of waiting
+            with mock.patch.object(self.index, "rebuild") as rebuild:
+                self.assertEqual(self.index.get(self.medicine.pk).name, "Paracetamol")
+            rebuild.assert_not_called()
+        finally:
+            self.index._rebuild_lock.release()
+        self.assertEqual(self.index.search_names(["acetamin"]), [self.index.get(self.medicine.pk)])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_items_share_a_batch(self):
+        batches = []
+        batcher = MicroBatcher(lambda items: batches.append(items) or [i * 2 for i in items], max_wait_ms=50, timeout=5)
+        with ThreadPoolExecutor(4) as pool:
+            self.assertEqual(list(pool.map(batcher, range(4))), [0, 2, 4, 6])
+        self.assertEqual(sum(len(batch) for batch in batches), 4)
+        self.assertLess(len(batches), 4)
+
+    def test_wrong_result_count_fails_the_whole_batch(self):
+        batcher = MicroBatcher(lambda items: items[:-1], max_wait_ms=50, timeout=5)
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(batcher, i) for i in range(3)]
+        for future in futures:
+            self.assertIsInstance(future.exception(), RuntimeError)
+
+    def test_timeout_drops_the_waiting_item(self):
+        started, release = threading.Event(), threading.Event()
+        processed = []
+
+        def process(items):
+            started.set()
+            release.wait(5)
+            processed.extend(items)
+            return items
+
+        batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=0, timeout=0.05)
+        with ThreadPoolExecutor(2) as pool:
+            blocking = pool.submit(batcher, "first", 5)
+            started.wait(5)
+            with self.assertRaises(TimeoutError):
+                batcher("second")
+            release.set()
+            self.assertEqual(blocking.result(), "first")
+        # "second" was cancelled before the batcher got to it
+        self.assertEqual(batcher("third", 5), "third")
+        self.assertEqual(processed, ["first", "third"])
+
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user("alice", "alice@example.com", "pw"))
+        self.upstream = requests.Response()
+        self.upstream.raw = mock.Mock()
+        patcher = mock.patch("chatbot.views.get_bot_client")
+        patcher.start().return_value.post.return_value = self.upstream
+        self.addCleanup(patcher.stop)
+
+    def post(self):
+        return self.client.post(reverse("chat_stream"), json.dumps({"message": "hi"}), content_type="application/json")
+
+    def test_error_status_closes_the_upstream(self):
+        self.upstream.status_code = 500
+        response = self.post()
+        self.assertEqual(response.status_code, 500)
+        self.upstream.raw.close.assert_called()
+
+    def test_stream_is_relayed_then_closed(self):
+        self.upstream.status_code = 200
+        with mock.patch.object(self.upstream, "iter_content", return_value=iter([b"data: a\n\n", b"data: b\n\n"])):
+            response = self.post()
+            # The test client closes the response once its content is exhausted
+            self.assertEqual(b"".join(response.streaming_content), b"data: a\n\ndata: b\n\n")
+        self.upstream.raw.close.assert_called()
+
+    def test_unread_stream_is_closed_with_the_response(self):
+        self.upstream.status_code = 200
+        self.post().close()
+        self.upstream.raw.close.assert_called()
+
+
+class PharmacyBotCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user("bob", "bob@example.com", "pw")
+        self.panadol = Medicine.objects.create(name="Panadol", price=Decimal("2.50"), category="Painkiller")
+        self.bot = PharmacyBot()
+
+    def test_carts_are_kept_per_owner(self):
+        self.bot.manage_cart("add 2 panadol to cart", action="add", session_id="s1", user_id=self.user.pk)
+        reply = self.bot.manage_cart("add panadol to cart", action="add", session_id="s2")
+        self.assertIn("Current Cart Total: $2.50", reply)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 2)
+        self.assertEqual(CartItem.objects.get(session_id="s2").quantity, 1)
+
+        self.bot.manage_cart("remove panadol", action="remove", session_id="s1", user_id=self.user.pk)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.assertTrue(CartItem.objects.filter(session_id="s2").exists())
+
+    def test_logged_in_totals_ignore_the_session_cart(self):
+        # Left over from before logging in
+        CartItem.objects.create(session_id="s1", medicine=self.panadol, quantity=5)
+        reply = self.bot.process_instruction("add all panadol to cart", session_id="s1", user_id=self.user.pk)
+        self.assertIn("Current Cart Total: $2.50", reply)
+        reply = self.bot.process_instruction("checkout", session_id="s1", user_id=self.user.pk)
+        self.assertIn("Your total is $2.50", reply)
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('send/', views.chat_send, name='chat_send'),
+    path('stream/', views.chat_stream, name='chat_stream'),
 ]
@@ -1,10 +1,28 @@
 import json
 import requests
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.conf import settings
+from .client import get_bot_client
+
+class _UpstreamStream:
+    """
+    The chat service's event stream as a response body. Django calls close() when the
+    response is finished, also when the client went away before it was iterated at all.
+    """
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+
+    def __iter__(self):
+        # chunk_size=None hands over each chunk as soon as it is received
+        return self.upstream.iter_content(chunk_size=None)
+
+    def close(self):
+        self.upstream.close()
+
 
 @require_POST
 def chat_send(request):
@@ -35,7 +53,7 @@ def chat_send(request):
         }
         
         try:
-            response = requests.post(fastapi_url, json=payload, timeout=60)
+            response = get_bot_client().post("/chat", json=payload)
             response.raise_for_status()
             
             # Return FastAPI response to frontend
@@ -52,3 +70,45 @@ def chat_send(request):
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_POST
+def chat_stream(request):
+    """Like chat_send, but relays the chat service's Server-Sent Events as they arrive."""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    user_message = data.get('message', '')
+    # Restriction: Only logged-in users (answered as JSON; the widget falls back to it)
+    if not request.user.is_authenticated:
+        return JsonResponse({'response': 'Please log in or sign up to use the AI Assistant. 🔒'}, status=200)
+    if not user_message:
+        return JsonResponse({'error': 'Message is required'}, status=400)
+
+    payload = {
+        'message': user_message,
+        'session_id': data.get('session_id', None),
+        'user_id': request.user.id,
+    }
+
+    upstream = None
+    try:
+        upstream = get_bot_client().post("/chat/stream", json=payload, stream=True)
+        upstream.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        # A streamed body that is never read keeps its pooled connection until closed
+        if upstream is not None:
+            upstream.close()
+        if isinstance(e, requests.exceptions.ConnectionError):
+            print(f"❌ Connection Error: Could not connect to Chatbot Service at {settings.FASTAPI_URL}")
+            return JsonResponse({'error': 'Chat service unavailable'}, status=503)
+        print(f"❌ Request Error: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+    response = StreamingHttpResponse(_UpstreamStream(upstream), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx-style proxies not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently from many threads and hands them to
+    `process_batch` as one list. A batch is flushed when it reaches `max_batch_size`
+    or `max_wait_ms` after its first item arrived, whichever comes first.
+    `process_batch(items)` must return one result per item, in order; if it returns a
+    different number of results, every item of the batch fails.
+
+    `process_batch` runs on the batcher thread, outside the submitters' contextvars, so
+    per-request bookkeeping (e.g. stage timings) has to be returned with the results and
+    recorded by the caller.
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 timeout: float = None, name: str = "micro-batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.timeout = timeout
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout: float = None):
+        """
+        Submit one item and block until its result is ready, at most `timeout` seconds
+        (default: the batcher's timeout) before raising concurrent.futures.TimeoutError.
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            # Not collected yet: drop it from its batch
+            future.cancel()
+            raise
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed: still sweep up anything already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Skip items whose caller already gave up
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(futures):
+                    raise RuntimeError(f"{self.name}: batch of {len(futures)} items returned {len(results)} results")
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -0,0 +1,205 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.db.models.signals import post_save, post_delete
+from store import search
+from store.catalog import catalog_version
+from store.models import Medicine
+
+from .fuzzy import FuzzyMatcher
+from .keyword_automaton import KeywordAutomaton
+
+logger = logging.getLogger(__name__)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _TrigramIndex:
+    """Inverted trigram index answering case-insensitive substring queries."""
+
+    def __init__(self):
+        self.texts = {}  # {medicine_id: lowercased text}
+        self.postings = defaultdict(set)  # {trigram: {medicine_id}}
+
+    def add(self, med_id, text: str):
+        self.remove(med_id)
+        text = (text or "").lower()
+        self.texts[med_id] = text
+        for gram in _trigrams(text):
+            self.postings[gram].add(med_id)
+
+    def remove(self, med_id):
+        text = self.texts.pop(med_id, None)
+        if text is None:
+            return
+        for gram in _trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(med_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, term: str) -> set:
+        """Ids whose text contains `term` (same semantics as `__icontains`)."""
+        term = term.lower()
+        grams = _trigrams(term)
+        if not grams:
+            # Terms shorter than a trigram can't use the postings
+            return {med_id for med_id, text in self.texts.items() if term in text}
+
+        # Intersect the rarest postings first, then verify the real substring
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            ids = self.postings.get(gram)
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return {med_id for med_id in candidates if term in self.texts[med_id]}
+
+
+class CatalogIndex:
+    """
+    In-process index over the Medicine catalog.
+    Built once at startup and kept up to date through Medicine save/delete signals. Edits made
+    by other processes (the Django admin) bump the shared catalog version (store.catalog), which
+    is checked at most every `check_interval` seconds; the index is also fully reloaded every
+    `refresh_interval` seconds. Only one caller rebuilds at a time, the others keep reading the
+    current snapshot meanwhile.
+    """
+
+    def __init__(self, refresh_interval: float = None, check_interval: float = None):
+        if refresh_interval is None:
+            refresh_interval = float(os.getenv("CATALOG_INDEX_REFRESH_SECONDS", "300"))
+        if check_interval is None:
+            check_interval = float(os.getenv("CATALOG_INDEX_CHECK_SECONDS", "2"))
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._catalog_version = None  # shared catalog version the snapshot was loaded at
+        self._checked_at = 0.0
+        self._medicines = {}  # {medicine_id: Medicine}
+        self._names = _TrigramIndex()
+        self._loaded_at = 0.0
+        self.version = 0
+        self._name_matcher = None
+        self._name_matcher_version = -1
+        self._name_automaton = None  # (KeywordAutomaton over names, {name: {medicine_id}})
+        self._name_automaton_version = -1
+
+        self.rebuild()
+
+        post_save.connect(self._on_save, sender=Medicine)
+        post_delete.connect(self._on_delete, sender=Medicine)
+
+    def rebuild(self):
+        # Read the version first: an edit made while loading triggers another rebuild
+        loaded_version = catalog_version()
+        medicines = list(Medicine.objects.all().order_by('pk'))
+        names = _TrigramIndex()
+        for med in medicines:
+            names.add(med.pk, med.name)
+
+        with self._lock:
+            self._medicines = {med.pk: med for med in medicines}
+            self._names = names
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._catalog_version = loaded_version
+            self.version += 1
+        logger.info("Catalog index built with %d medicines.", len(medicines))
+
+    def _is_stale(self, now: float) -> bool:
+        if self.refresh_interval and now - self._loaded_at > self.refresh_interval:
+            return True
+        if self.check_interval is not None and now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            return catalog_version() != self._catalog_version
+        return False
+
+    def _ensure_fresh(self):
+        if not self._is_stale(time.monotonic()):
+            return
+        # Someone else is already rebuilding: keep serving the current snapshot
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Catalog index rebuild failed; keeping the previous snapshot")
+        finally:
+            self._rebuild_lock.release()
+
+    def _on_save(self, sender, instance, **kwargs):
+        with self._lock:
+            self._medicines[instance.pk] = instance
+            self._names.add(instance.pk, instance.name)
+            self.version += 1
+
+    def _on_delete(self, sender, instance, **kwargs):
+        with self._lock:
+            self._medicines.pop(instance.pk, None)
+            self._names.remove(instance.pk)
+            self.version += 1
+
+    def _resolve(self, ids) -> list:
+        return [self._medicines[med_id] for med_id in sorted(ids)]
+
+    def all(self) -> list:
+        self._ensure_fresh()
+        with self._lock:
+            return self._resolve(self._medicines)
+
+    def get(self, med_id):
+        self._ensure_fresh()
+        return self._medicines.get(med_id)
+
+    def closest_name(self, word: str, cutoff: float = 0.7):
+        """Fuzzy match `word` against the lowercased catalog names."""
+        self._ensure_fresh()
+        with self._lock:
+            if self._name_matcher_version != self.version:
+                self._name_matcher = FuzzyMatcher(name for name in self._names.texts.values() if name)
+                self._name_matcher_version = self.version
+            matcher = self._name_matcher
+        return matcher.best(word, cutoff)
+
+    def find_names_in(self, text: str) -> list:
+        """Medicines whose name occurs anywhere in `text`, in catalog order, in one scan of the text."""
+        self._ensure_fresh()
+        with self._lock:
+            if self._name_automaton_version != self.version:
+                ids_by_name = defaultdict(set)
+                for med_id, name in self._names.texts.items():
+                    if name:
+                        ids_by_name[name].add(med_id)
+                self._name_automaton = (KeywordAutomaton(ids_by_name), dict(ids_by_name))
+                self._name_automaton_version = self.version
+            automaton, ids_by_name = self._name_automaton
+            ids = set()
+            for name in automaton.find(text.lower()):
+                ids |= ids_by_name[name]
+            return self._resolve(ids & self._medicines.keys())
+
+    def search_names(self, terms) -> list:
+        """Medicines whose name contains any of `terms`, in catalog order."""
+        self._ensure_fresh()
+        with self._lock:
+            ids = set()
+            for term in terms:
+                ids |= self._names.search(term)
+            return self._resolve(ids)
+
+    def search_descriptions(self, terms) -> list:
+        """Medicines whose description mentions any of `terms`, best match first (one full-text query)."""
+        ids = search.search_ids(" ".join(terms), fields=("description",), match_any=True)
+        self._ensure_fresh()
+        with self._lock:
+            return [self._medicines[med_id] for med_id in ids if med_id in self._medicines]
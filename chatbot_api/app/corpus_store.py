@@ -0,0 +1,74 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+
+class RecordStore:
+    """
+    Read-only sequence of JSON records stored as one UTF-8 blob plus an offsets table.
+
+    Both files are memory-mapped, so opening a store is O(1) regardless of its size,
+    a record is only decoded when it is accessed, and every worker process on the
+    host shares the same page-cache copy.
+    """
+
+    def __init__(self, path_prefix: str):
+        self.path_prefix = path_prefix
+        self.offsets = np.load(path_prefix + ".offsets.npy", mmap_mode='r')
+        self._file = open(path_prefix + ".blob", 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if len(self.offsets) == 0 or int(self.offsets[-1]) != size:
+            self._file.close()
+            raise ValueError(f"Record store {path_prefix} is incomplete (blob and offsets disagree)")
+        # mmap can't map an empty file
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @staticmethod
+    def exists(path_prefix: str) -> bool:
+        return os.path.exists(path_prefix + ".blob") and os.path.exists(path_prefix + ".offsets.npy")
+
+    @staticmethod
+    def mtime(path_prefix: str) -> float:
+        return min(os.path.getmtime(path_prefix + ".blob"), os.path.getmtime(path_prefix + ".offsets.npy"))
+
+    @staticmethod
+    def write(records, path_prefix: str):
+        """Serialise `records` and atomically replace the store at `path_prefix`."""
+        os.makedirs(os.path.dirname(path_prefix) or ".", exist_ok=True)
+        offsets = [0]
+        # Per-process temp names: several workers may rebuild the same store at startup
+        blob_tmp = f"{path_prefix}.blob.{os.getpid()}.tmp"
+        with open(blob_tmp, 'wb') as f:
+            for record in records:
+                data = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+        # np.save appends ".npy" unless the name already ends with it
+        offsets_tmp = f"{path_prefix}.offsets.{os.getpid()}.tmp.npy"
+        np.save(offsets_tmp, np.array(offsets, dtype=np.int64))
+        # Readers opening between the two renames see a size mismatch and refuse the store
+        os.replace(blob_tmp, path_prefix + ".blob")
+        os.replace(offsets_tmp, path_prefix + ".offsets.npy")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return json.loads(self._blob[start:end].decode('utf-8'))
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
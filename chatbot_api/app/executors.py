@@ -0,0 +1,45 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+# Separate, bounded pools: slow embedding/FAISS work can't take the threads cart and
+# catalog queries need, and the DB pool can never open more connections than its size.
+CPU_WORKERS = int(os.getenv("CHATBOT_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+DB_WORKERS = int(os.getenv("CHATBOT_DB_WORKERS", "8"))
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="chatbot-cpu")
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="chatbot-db")
+
+
+async def run_cpu(func, *args, **kwargs):
+    """Run CPU-bound work (embedding, FAISS search, fuzzy matching) on the CPU pool."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(cpu_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def _with_db_connection(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Outside Django's request cycle, so drop stale/broken connections ourselves
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def run_db(func, *args, **kwargs):
+    """Run code that touches the Django ORM on the DB pool."""
+    return await sync_to_async(_with_db_connection(func), thread_sensitive=False, executor=db_executor)(*args, **kwargs)
+
+
+def shutdown():
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
+    db_executor.shutdown(wait=False, cancel_futures=True)
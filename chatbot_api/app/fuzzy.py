@@ -0,0 +1,69 @@
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+
+
+class FuzzyMatcher:
+    """
+    Drop-in replacement for `difflib.get_close_matches(word, vocabulary, n=1, cutoff)`.
+
+    difflib scores every candidate with SequenceMatcher. Here the vocabulary is
+    indexed once (lengths + character counts) so that a single vectorised pass
+    applies the same upper bounds difflib uses (`real_quick_ratio`, `quick_ratio`)
+    to the whole vocabulary, and only the few survivors get an exact `ratio()`.
+    Because the bounds are exact, the winner and its score are identical to difflib's.
+    """
+
+    def __init__(self, vocabulary, cache_size: int = 4096):
+        self._word_set = {w for w in vocabulary if w}
+        self.words = sorted(self._word_set)
+        self._alphabet = {}
+        for word in self.words:
+            for ch in word:
+                self._alphabet.setdefault(ch, len(self._alphabet))
+
+        self._lengths = np.array([len(w) for w in self.words], dtype=np.int64)
+        self._counts = np.zeros((len(self.words), max(len(self._alphabet), 1)), dtype=np.int64)
+        for row, word in enumerate(self.words):
+            for ch in word:
+                self._counts[row, self._alphabet[ch]] += 1
+
+        self.best = lru_cache(maxsize=cache_size)(self._best)
+
+    def __contains__(self, word):
+        return word in self._word_set
+
+    def _best(self, word: str, cutoff: float = 0.6):
+        """Best match for `word` scoring at least `cutoff`, or None."""
+        if not self.words or not word:
+            return None
+
+        query = np.zeros(self._counts.shape[1], dtype=np.int64)
+        for ch in word:
+            col = self._alphabet.get(ch)
+            if col is not None:
+                query[col] += 1
+
+        totals = self._lengths + len(word)
+        # Same bounds (and float arithmetic) as SequenceMatcher.real_quick_ratio / quick_ratio
+        real_quick = 2.0 * np.minimum(self._lengths, len(word)) / totals
+        quick = 2.0 * np.minimum(self._counts, query).sum(axis=1) / totals
+        survivors = np.nonzero((real_quick >= cutoff) & (quick >= cutoff))[0]
+
+        best = None
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for row in survivors:
+            candidate = self.words[row]
+            matcher.set_seq1(candidate)
+            score = matcher.ratio()
+            # difflib keeps the largest (score, word) tuple
+            if score >= cutoff and (best is None or (score, candidate) > best):
+                best = (score, candidate)
+        return best[1] if best else None
+
+
+def close_match(word: str, vocabulary, cutoff: float = 0.6):
+    """One-off lookup against a small, short-lived vocabulary."""
+    return FuzzyMatcher(vocabulary, cache_size=0).best(word, cutoff)
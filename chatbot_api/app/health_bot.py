@@ -1,19 +1,74 @@
 import os
 import json
+import hashlib
 import re
+import time
+import asyncio
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from pharmacy.metrics import add_to_request, stage, timed
+
+from .batching import MicroBatcher
+from .cache import TTLCache
+from .executors import run_cpu
+from .corpus_store import RecordStore
+from .lexical_index import BM25Index
+from .vector_index import IndexConfig, build_index, configure_search, supports_remove
+
+# Display order and headers of monograph sections
+SECTION_HEADERS = [
+    ("Indications", "**✅ Uses:**"),
+    ("Contraindications", "**⛔ Do Not Use If:**"),
+    ("Warnings", "**⚠️ Warnings:**"),
+    ("Interactions", "**🔁 Drug/Food Interactions:**"),
+    ("Dosage", "**📋 Dosage:**"),
+]
+SECTION_KEYS = [key for key, _ in SECTION_HEADERS]
+
+# Section markers in the raw corpus text -> monograph section keys
+CORPUS_SECTIONS = {
+    "Indications": "Indications",
+    "Dosage": "Dosage",
+    "Contraindications": "Contraindications",
+    "Warnings": "Warnings",
+    "Drug Interactions": "Interactions",
+}
+SECTION_MARKER = re.compile(r'\*\*(' + '|'.join(CORPUS_SECTIONS) + r'):\*\*', re.IGNORECASE)
+
+class _PendingSearch:
+    """State carried from HealthBot._begin_search over the vector search to _end_search."""
+
+    def __init__(self, query, enhanced_query, brand_used, top_k, candidates, lexical_hits, lexical_best, cache_key):
+        self.query = query
+        self.enhanced_query = enhanced_query
+        self.brand_used = brand_used
+        self.top_k = top_k
+        self.candidates = candidates
+        self.lexical_hits = lexical_hits
+        self.lexical_best = lexical_best
+        self.cache_key = cache_key
+
 
 class HealthBot:
     def __init__(self):
         self.model_name = 'all-MiniLM-L6-v2'
-        print(f"Loading HealthBot model: {self.model_name}...")
-        self.model = SentenceTransformer(self.model_name)
+        # torch: SentenceTransformer in fp32 PyTorch; onnx: int8 ONNX export on onnxruntime
+        self.encoder_backend = os.getenv("HEALTHBOT_ENCODER", "torch").lower()
+        # Recorded in the index manifest: vectors from different encoders are never mixed in one index
+        self.encoder_id = "torch"
+        print(f"Loading HealthBot model: {self.model_name} ({self.encoder_backend})...")
+        self.model = self._load_encoder()
         
         # Paths
         self.corpus_path = os.path.join(os.path.dirname(__file__), '../corpus/cleaned/health_data.json')
         self.index_path = os.path.join(os.path.dirname(__file__), '../embeddings/faiss_index.bin')
+        self.manifest_path = os.path.join(os.path.dirname(__file__), '../embeddings/index_manifest.json')
+        # BM25 weights over the same passages, rows addressed by FAISS vector id (.npz + .json)
+        self.lexical_path = os.path.join(os.path.dirname(__file__), '../embeddings/lexical_index')
+        # Memory-mapped sidecars derived from the corpus (see corpus_store.RecordStore)
+        self.documents_path = os.path.join(os.path.dirname(__file__), '../embeddings/corpus')
+        self.monographs_path = os.path.join(os.path.dirname(__file__), '../embeddings/monographs')
+        self.generic_lookup_path = os.path.join(os.path.dirname(__file__), '../embeddings/generic_lookup.json')
         
         # Synonym Mapping
         self.synonyms = {
@@ -30,66 +85,411 @@ class HealthBot:
         }
 
         self.documents = []
+        self.monographs = []
         self.index = None
+        self.lexical = None
+        self.vector_positions = np.empty(0, dtype='int64')  # FAISS vector id -> document position
+        self.vector_sections = np.empty(0, dtype='int64')  # FAISS vector id -> SECTION_KEYS index (-1: whole document)
+        self.index_config = IndexConfig.from_env(os.environ)
         self.generic_lookup = {}
+
+        # Documents are embedded as section passages of at most `chunk_chars` characters
+        # (MiniLM truncates longer input); a query retrieves `chunk_candidates` passages per
+        # requested answer, which are then grouped by document
+        self.chunk_chars = int(os.getenv("HEALTHBOT_CHUNK_CHARS", "800"))
+        self.chunk_candidates = int(os.getenv("HEALTHBOT_CHUNK_CANDIDATES", "8"))
+        self.chunking = f"sections-{self.chunk_chars}"
+        # Best passage further than this means the query is off-topic. Embeddings are unit
+        # vectors and FAISS reports squared L2, so a distance d is a cosine similarity of 1 - d/2
+        # (1.5: cosine 0.25). The default was tuned on whole-document vectors and is not yet
+        # calibrated for passage vectors: check it with chatbot_api/scripts/calibrate_distance.py
+        self.max_distance = float(os.getenv("HEALTHBOT_MAX_DISTANCE", "1.5"))
+
+        # Hybrid retrieval: BM25 and vector rankings are merged with reciprocal-rank fusion.
+        # A BM25 winner scoring at least `lexical_min_score` and `lexical_margin` times the
+        # runner-up is answered without running the encoder at all
+        self.rrf_k = float(os.getenv("HEALTHBOT_RRF_K", "60"))
+        self.lexical_min_score = float(os.getenv("HEALTHBOT_LEXICAL_MIN_SCORE", "12"))
+        self.lexical_margin = float(os.getenv("HEALTHBOT_LEXICAL_MARGIN", "1.5"))
+
+        # Concurrent searches are encoded and searched together in one forward pass
+        self.batcher = MicroBatcher(
+            self._encode_and_search,
+            max_batch_size=int(os.getenv("HEALTHBOT_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("HEALTHBOT_BATCH_WAIT_MS", "5")),
+            timeout=float(os.getenv("HEALTHBOT_BATCH_TIMEOUT", "30")),
+            name="healthbot-batcher",
+        )
+
+        # Caches keyed on the preprocessed query; cleared whenever the corpus/index is (re)loaded
+        cache_size = int(os.getenv("HEALTHBOT_CACHE_SIZE", "1024"))
+        cache_ttl = float(os.getenv("HEALTHBOT_CACHE_TTL", "3600"))
+        self.embedding_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.response_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
         
         self._initialize_resources()
 
+    def _load_encoder(self):
+        if self.encoder_backend == "onnx":
+            try:
+                from .onnx_encoder import DEFAULT_MODEL_PATH, OnnxEncoder
+                encoder = OnnxEncoder(os.getenv("HEALTHBOT_ONNX_MODEL") or DEFAULT_MODEL_PATH,
+                                      threads=int(os.getenv("HEALTHBOT_ONNX_THREADS", "0")))
+                if encoder.model_name != self.model_name:
+                    raise ValueError(f"export is of {encoder.model_name}, expected {self.model_name}")
+                self.encoder_id = f"onnx:{encoder.model_file}"
+                return encoder
+            except (ImportError, OSError, RuntimeError, ValueError) as e:
+                print(f"⚠️ ONNX encoder unavailable ({e}). Falling back to PyTorch.")
+                self.encoder_backend = "torch"
+        elif self.encoder_backend != "torch":
+            print(f"⚠️ Unknown HEALTHBOT_ENCODER '{self.encoder_backend}'. Using PyTorch.")
+            self.encoder_backend = "torch"
+
+        # Imported here so ONNX-only workers never load torch
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
     def _initialize_resources(self):
-        # 1. Load Corpus
-        if os.path.exists(self.corpus_path):
-             with open(self.corpus_path, 'r', encoding='utf-8') as f:
-                 self.documents = json.load(f)
-             print(f"Loaded {len(self.documents)} documents from corpus.")
-             
-             # Build generic lookup for keyword boosting
-             for idx, doc in enumerate(self.documents):
-                 # Assume format "**Drug Info for NAME**"
-                 match = re.search(r'\*\*Drug Info for (.*?)\*\*', doc.get('text', ''))
-                 if match:
-                     name = match.group(1).lower().strip()
-                     self.generic_lookup[name] = idx
-                     
-        else:
+        # 1. Load Corpus (memory-mapped sidecars, rebuilt from the JSON corpus when missing or stale)
+        if not os.path.exists(self.corpus_path):
             print("Warning: Corpus file not found.")
             return
 
-        # 2. Check Loop: Rebuild Index if needed
-        rebuild = False
+        if self._sidecars_stale():
+            self._build_sidecars()
+        try:
+            self._open_sidecars()
+        except (OSError, ValueError) as e:
+            print(f"Corpus sidecars are unreadable ({e}). Rebuilding...")
+            self._build_sidecars()
+            self._open_sidecars()
+        print(f"Loaded {len(self.documents)} documents from corpus.")
+
+        # 2. Check Loop: bring the index up to date with the corpus
+        manifest = self._load_manifest()
         if not os.path.exists(self.index_path):
-            rebuild = True
-        elif os.path.exists(self.corpus_path):
-             # Ensure index is newer than corpus
-             if os.path.getmtime(self.corpus_path) > os.path.getmtime(self.index_path):
-                 print("Corpus is newer than index. Rebuilding...")
-                 rebuild = True
-        
-        if rebuild:
             self._build_index()
+        else:
+            stale = os.path.getmtime(self.corpus_path) > os.path.getmtime(self.index_path)
+            if manifest is None or manifest.get('model') != self.model_name or \
+                    manifest.get('encoder', 'torch') != self.encoder_id or \
+                    manifest.get('index_type', 'flat') != self.index_config.index_type or \
+                    manifest.get('chunking') != self.chunking:
+                print("Index has no manifest for this model/encoder/index type/chunking. Rebuilding...")
+                self._build_index()
+            elif stale:
+                print("Corpus is newer than index. Updating changed documents...")
+                self._update_index(manifest)
         
         # 3. Load Index
         if os.path.exists(self.index_path):
             print("Loading FAISS index...")
-            self.index = faiss.read_index(self.index_path)
+            index = self._read_index(self.index_path)
+            manifest = self._load_manifest()
+            if manifest is None or manifest['ntotal'] != index.ntotal or \
+                    len(manifest['documents']) != len(self.documents):
+                print("Index manifest is out of sync. Rebuilding...")
+                self._build_index()
+                index = self._read_index(self.index_path)
+                manifest = self._load_manifest()
+            self.vector_positions = self._vector_positions(manifest)
+            self.vector_sections = self._vector_sections(manifest)
+            self.lexical = self._load_lexical(manifest)
+            self.index = index
         else:
             print("Error: FAISS index could not be created or loaded.")
 
+        self.invalidate_caches()
+
+    def _sidecars_stale(self) -> bool:
+        for prefix in (self.documents_path, self.monographs_path):
+            if not RecordStore.exists(prefix) or RecordStore.mtime(prefix) < os.path.getmtime(self.corpus_path):
+                return True
+        return not os.path.exists(self.generic_lookup_path) or \
+            os.path.getmtime(self.generic_lookup_path) < os.path.getmtime(self.corpus_path)
+
+    def _build_sidecars(self):
+        """Parse the JSON corpus once and write the documents, monographs and name lookup sidecars."""
+        print("Building corpus sidecars...")
+        with open(self.corpus_path, 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+
+        # Build generic lookup for keyword boosting
+        generic_lookup = {}
+        for idx, doc in enumerate(documents):
+            # Assume format "**Drug Info for NAME**"
+            match = re.search(r'\*\*Drug Info for (.*?)\*\*', doc.get('text', ''))
+            if match:
+                name = match.group(1).lower().strip()
+                generic_lookup[name] = idx
+
+        # Pre-parse every document once so answering a query only fills in the title
+        monographs = [self._parse_monograph(doc.get('text', '')) for doc in documents]
+
+        RecordStore.write(documents, self.documents_path)
+        RecordStore.write(monographs, self.monographs_path)
+        tmp_path = f"{self.generic_lookup_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(generic_lookup, f, ensure_ascii=False)
+        os.replace(tmp_path, self.generic_lookup_path)
+        print(f"Saved {len(documents)} documents and monographs.")
+
+    def _open_sidecars(self):
+        documents = RecordStore(self.documents_path)
+        monographs = RecordStore(self.monographs_path)
+        if len(monographs) != len(documents):
+            raise ValueError("monographs are out of sync with the corpus")
+        with open(self.generic_lookup_path, 'r', encoding='utf-8') as f:
+            generic_lookup = json.load(f)
+        self.documents, self.monographs, self.generic_lookup = documents, monographs, generic_lookup
+
+    def _read_index(self, path: str):
+        # Map the index file instead of copying it onto the heap; workers share the page cache
+        flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', getattr(faiss, 'IO_FLAG_MMAP', 0))
+        try:
+            index = faiss.read_index(path, flags)
+        except RuntimeError as e:
+            print(f"Memory-mapped index load failed ({e}). Reading it into memory instead.")
+            index = faiss.read_index(path)
+        return configure_search(index, self.index_config)
+
+    def invalidate_caches(self):
+        """Drop cached embeddings/answers (called whenever the corpus or index changes)."""
+        self.embedding_cache.clear()
+        self.response_cache.clear()
+
+    def cache_stats(self) -> dict:
+        return {"embeddings": self.embedding_cache.stats(), "responses": self.response_cache.stats()}
+
+    def _split_passages(self, text: str) -> list:
+        """Split text at sentence boundaries into passages of at most `chunk_chars` characters."""
+        passages, current = [], ""
+        for sentence in re.split(r'(?<=[.;!?])\s+', text.strip()):
+            # A single overlong sentence is cut at word boundaries
+            while len(sentence) > self.chunk_chars:
+                cut = sentence.rfind(' ', 0, self.chunk_chars)
+                cut = cut if cut > 0 else self.chunk_chars
+                if current:
+                    passages.append(current)
+                    current = ""
+                passages.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if current and len(current) + 1 + len(sentence) > self.chunk_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+        return passages
+
+    def _chunk_document(self, doc: dict) -> list:
+        """
+        (section key or None, passage) pairs embedded for one document: each labelled
+        section (Indications, Warnings, Dosage...) split into passages prefixed with the
+        drug name and section, so every passage is searchable on its own.
+        """
+        text = doc.get('text', '')
+        title_match = re.search(r'\*\*Drug Info for (.*?)\*\*', text)
+        title = title_match.group(1) if title_match else (doc.get('title') or "")
+
+        markers = list(SECTION_MARKER.finditer(text))
+        if not markers:
+            # Unstructured document: plain passages with the title for context
+            return [(None, f"{title}: {p}" if title else p) for p in self._split_passages(text)] or [(None, text)]
+
+        chunks = []
+        for i, marker in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+            label = marker.group(1)
+            section = CORPUS_SECTIONS.get(label.title(), CORPUS_SECTIONS.get(label))
+            for passage in self._split_passages(text[marker.end():end]):
+                chunks.append((section, f"{title} - {label}: {passage}"))
+        return chunks or [(None, text)]
+
+    def _doc_chunks(self, doc: dict) -> list:
+        """Texts embedded for one document; each becomes its own vector in the index."""
+        return [chunk for _, chunk in self._chunk_document(doc)]
+
+    @staticmethod
+    def _doc_id(doc: dict) -> str:
+        return str(doc.get('id') or hashlib.sha1(doc.get('text', '').encode('utf-8')).hexdigest())
+
+    def _manifest_entry(self, doc: dict, chunks: list, ids: list) -> dict:
+        """Manifest record for one document; `chunks` are (section, text) pairs."""
+        digest = hashlib.sha1('\x00'.join(text for _, text in chunks).encode('utf-8')).hexdigest()
+        return {"id": self._doc_id(doc), "hash": digest, "ids": ids, "sections": [section for section, _ in chunks]}
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _vector_positions(manifest: dict):
+        positions = np.full(manifest['next_id'], -1, dtype='int64')
+        for pos, entry in enumerate(manifest['documents']):
+            positions[entry['ids']] = pos
+        return positions
+
+    @staticmethod
+    def _vector_sections(manifest: dict):
+        sections = np.full(manifest['next_id'], -1, dtype='int64')
+        for entry in manifest['documents']:
+            for vector_id, section in zip(entry['ids'], entry.get('sections') or []):
+                if section in SECTION_KEYS:
+                    sections[vector_id] = SECTION_KEYS.index(section)
+        return sections
+
+    def _to_positions(self, I):
+        """Map FAISS vector ids to document positions (-1 where there was no hit)."""
+        ids = np.asarray(I)
+        if not len(self.vector_positions):
+            return np.full_like(ids, -1)
+        valid = (ids >= 0) & (ids < len(self.vector_positions))
+        return np.where(valid, self.vector_positions[np.where(valid, ids, 0)], -1)
+
+    def _group_hits(self, D, I, top_k: int) -> list:
+        """
+        Collapse passage hits into the `top_k` best documents: (position, distance,
+        matched section keys) with each document scored by its closest passage. The
+        section set is None when a matched passage isn't tied to a labelled section.
+        """
+        ids = np.asarray(I)[0]
+        positions = self._to_positions(ids)
+        valid = (ids >= 0) & (ids < len(self.vector_sections))
+        sections = np.where(valid, self.vector_sections[np.where(valid, ids, 0)], -1)
+
+        hits = {}
+        for distance, pos, section in zip(np.asarray(D)[0], positions, sections):
+            if not 0 <= pos < len(self.documents):
+                continue
+            if pos not in hits:
+                if len(hits) == top_k:
+                    continue
+                hits[pos] = [float(distance), set()]
+            if hits[pos][1] is None:
+                continue
+            if section < 0:
+                hits[pos][1] = None
+            else:
+                hits[pos][1].add(SECTION_KEYS[section])
+        return [(int(pos), distance, matched) for pos, (distance, matched) in hits.items()]
+
     def _build_index(self):
         print("Building FAISS index...")
-        texts = [doc['text'] for doc in self.documents]
+        entries, texts = [], []
+        for doc in self.documents:
+            chunks = self._chunk_document(doc)
+            entries.append(self._manifest_entry(doc, chunks, list(range(len(texts), len(texts) + len(chunks)))))
+            texts += [text for _, text in chunks]
         embeddings = self.model.encode(texts)
         
-        # Initialize FAISS
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(np.array(embeddings).astype('float32'))
-        
-        # Save
-        # Ensure dir exists
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(index, self.index_path)
+        # Initialize FAISS (ids let single documents be replaced or removed later)
+        index = build_index(np.array(embeddings).astype('float32'), np.arange(len(texts), dtype='int64'),
+                            self.index_config)
+        self._save_index(index, entries, next_id=len(texts))
         print("FAISS index built and saved.")
 
+    def _update_index(self, manifest: dict):
+        """Encode only new or changed documents and drop deleted ones, keeping every other vector."""
+        # Work on a heap copy: a memory-mapped index is read-only
+        index = faiss.read_index(self.index_path)
+        previous = {entry['id']: entry for entry in manifest['documents']}
+        next_id = manifest['next_id']
+        entries, texts, new_ids, stale_ids = [], [], [], []
+        for doc in self.documents:
+            chunks = self._chunk_document(doc)
+            entry = self._manifest_entry(doc, chunks, [])
+            old = previous.pop(entry['id'], None)
+            if old is not None and old['hash'] == entry['hash']:
+                entry['ids'] = old['ids']
+                entries.append(entry)
+                continue
+            if old is not None:
+                stale_ids += old['ids']
+            entry['ids'] = list(range(next_id, next_id + len(chunks)))
+            next_id += len(chunks)
+            new_ids += entry['ids']
+            texts += [text for _, text in chunks]
+            entries.append(entry)
+
+        # Whatever is left has been deleted from the corpus
+        for old in previous.values():
+            stale_ids += old['ids']
+
+        if stale_ids and not supports_remove(index):
+            print("Index type cannot remove vectors. Rebuilding...")
+            return self._build_index()
+        if stale_ids:
+            index.remove_ids(np.array(stale_ids, dtype='int64'))
+        if texts:
+            embeddings = np.array(self.model.encode(texts)).astype('float32')
+            index.add_with_ids(embeddings, np.array(new_ids, dtype='int64'))
+        self._save_index(index, entries, next_id)
+        print(f"FAISS index updated: {len(texts)} vectors encoded, {len(stale_ids)} removed.")
+
+    def _save_index(self, index, entries: list, next_id: int):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        manifest = {"model": self.model_name, "encoder": self.encoder_id, "index_type": self.index_config.index_type,
+                    "chunking": self.chunking, "next_id": next_id, "ntotal": index.ntotal, "documents": entries}
+        # Write then rename: a running worker may have the old file memory-mapped
+        index_tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        manifest_tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        faiss.write_index(index, index_tmp)
+        with open(manifest_tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(index_tmp, self.index_path)
+        os.replace(manifest_tmp, self.manifest_path)
+        self._build_lexical(manifest)
+        self.invalidate_caches()
+
+    def _build_lexical(self, manifest: dict):
+        """BM25 index over the passages the manifest lists, one row per FAISS vector id."""
+        passages = []
+        for entry, doc in zip(manifest['documents'], self.documents):
+            passages += zip(entry['ids'], self._doc_chunks(doc))
+        meta = {"chunking": manifest.get('chunking'), "next_id": manifest['next_id'], "ntotal": manifest['ntotal']}
+        lexical = BM25Index.build(passages, n_rows=manifest['next_id'], meta=meta)
+        lexical.save(self.lexical_path)
+        return lexical
+
+    def _load_lexical(self, manifest: dict):
+        meta = {"chunking": manifest.get('chunking'), "next_id": manifest['next_id'], "ntotal": manifest['ntotal']}
+        if BM25Index.exists(self.lexical_path):
+            try:
+                lexical = BM25Index.load(self.lexical_path)
+                if lexical.meta == meta:
+                    return lexical
+            except (OSError, ValueError, KeyError) as e:
+                print(f"BM25 index is unreadable ({e}).")
+        print("Building BM25 index...")
+        return self._build_lexical(manifest)
+
+    def _encode_and_search(self, requests: list) -> list:
+        """
+        Batch handler: requests are (query, top_k) tuples, returns one (D, I, timings) tuple
+        per request. Runs on the batcher thread, so the stage timings ({stage: seconds}, shared
+        by the whole batch) are handed back for the callers to add to their own requests.
+        """
+        queries = [q for q, _ in requests]
+        k = max(top_k for _, top_k in requests)
+        started = time.perf_counter()
+        with stage("healthbot", "embedding"):
+            query_vectors = np.array(self.model.encode(queries)).astype('float32')
+        encoded = time.perf_counter()
+        for query, vector in zip(queries, query_vectors):
+            self.embedding_cache.set(query, vector)
+        with stage("healthbot", "faiss"):
+            D, I = self.index.search(query_vectors, k)
+        timings = {"embedding": encoded - started, "faiss": time.perf_counter() - encoded}
+        return [(D[i:i + 1, :top_k], I[i:i + 1, :top_k], timings) for i, (_, top_k) in enumerate(requests)]
+
     def _preprocess_query(self, query: str) -> str:
         """Replace brand names with generics to improve search relevance."""
         words = query.lower().split()
@@ -173,17 +573,11 @@ class HealthBot:
         
         return "\n".join(bullets)
 
-    def _smart_format(self, raw_text: str, query_brand: str = None) -> str:
-        """Parse raw text into structured, concise sections with headers and bullets."""
+    def _parse_monograph(self, raw_text: str) -> dict:
+        """Parse raw label text into the structured sections shown to users (query independent)."""
         # 1. Extract Drug Name
         title_match = re.search(r'\*\*Drug Info for (.*?)\*\*', raw_text)
         generic_name = title_match.group(1) if title_match else "Medicine"
-        
-        # Display Title Logic: "Panadol (Acetaminophen)" or just "Acetaminophen"
-        if query_brand and query_brand.lower() != generic_name.lower() and query_brand.lower() not in generic_name.lower():
-             display_title = f"{query_brand.title()} (same as {generic_name})"
-        else:
-             display_title = generic_name
 
         # 2. Extract Sections
         # We need flexible lookaheads because sections might appear in any order or be missing
@@ -203,59 +597,133 @@ class HealthBot:
             if match:
                 content = match.group(1).strip()
                 # Convert to bullet points with section context
-                sections[key] = self._to_bullet_points(content, section_name=key)
-                if sections[key] != "Information not available.":
+                bullets = self._to_bullet_points(content, section_name=key)
+                if bullets != "Information not available.":
                     has_content = True
-            else:
-                sections[key] = "Information not available."
+                    if bullets:
+                        sections[key] = bullets
 
-        # 3. Construct Clean Output
-        # User requested "just drug name in bold" and no hashtags
-        # We assume the Frontend chat.js handles **Bold** correctly now.
-        response = f"**{display_title}**\n\n"
-        
-        if sections.get('Indications') and sections['Indications'] != "Information not available.":
-            response += f"**✅ Uses:**\n{sections['Indications']}\n\n"
-
-        if sections.get('Contraindications') and sections['Contraindications'] != "Information not available.":
-            response += f"**⛔ Do Not Use If:**\n{sections['Contraindications']}\n\n"
-            
-        if sections.get('Warnings') and sections['Warnings'] != "Information not available.":
-            response += f"**⚠️ Warnings:**\n{sections['Warnings']}\n\n"
+        monograph = {"generic_name": generic_name, "sections": sections}
 
-        if sections.get('Interactions') and sections['Interactions'] != "Information not available.":
-            response += f"**🔁 Drug/Food Interactions:**\n{sections['Interactions']}\n\n"
-            
-        if sections.get('Dosage') and sections['Dosage'] != "Information not available.":
-            response += f"**📋 Dosage:**\n{sections['Dosage']}"
-            
         # Fallback: If parsing failed to extract sections, show simplified raw text
         if not has_content:
              # Basic cleanup of formatting artifacts
              clean_text = raw_text.replace("**Indications:**", "").replace("**Warnings:**", "").replace("**Dosage:**", "").strip()
              # Truncate if huge, but usually safe to show mostly
-             summary = clean_text[:600] + ("..." if len(clean_text) > 600 else "")
-             response += f"**ℹ️ General Information:**\n{summary}"
+             monograph["summary"] = clean_text[:600] + ("..." if len(clean_text) > 600 else "")
+        return monograph
+
+    def _fuse(self, *rankings, top_k: int) -> list:
+        """
+        Reciprocal-rank fusion of grouped hit lists: each document scores 1 / (rrf_k + rank)
+        in every list it appears in. Returns the `top_k` best (position, matched sections),
+        the sections coming from the first list that has the document.
+        """
+        scores, sections = {}, {}
+        for hits in rankings:
+            for rank, (pos, _, matched) in enumerate(hits, start=1):
+                scores[pos] = scores.get(pos, 0.0) + 1.0 / (self.rrf_k + rank)
+                sections.setdefault(pos, matched)
+        best = sorted(scores, key=lambda pos: (-scores[pos], pos))[:top_k]
+        return [(pos, sections[pos]) for pos in best]
+
+    @timed("healthbot", "formatting")
+    def _render_monograph(self, monograph: dict, query_brand: str = None, only_sections=None) -> str:
+        """
+        Fill in the display title for a parsed monograph. With `only_sections` just those
+        sections are shown (the whole monograph if it has none of them).
+        """
+        generic_name = monograph["generic_name"]
+        
+        # Display Title Logic: "Panadol (Acetaminophen)" or just "Acetaminophen"
+        if query_brand and query_brand.lower() != generic_name.lower() and query_brand.lower() not in generic_name.lower():
+             display_title = f"{query_brand.title()} (same as {generic_name})"
+        else:
+             display_title = generic_name
+
+        # 3. Construct Clean Output
+        # User requested "just drug name in bold" and no hashtags
+        # We assume the Frontend chat.js handles **Bold** correctly now.
+        response = f"**{display_title}**\n\n"
+        sections = monograph["sections"]
+        if only_sections and any(key in sections for key in only_sections):
+            sections = {key: text for key, text in sections.items() if key in only_sections}
+        else:
+            only_sections = None
+        for key, header in SECTION_HEADERS:
+            if key in sections:
+                response += f"{header}\n{sections[key]}\n\n"
+
+        if "summary" in monograph and not only_sections:
+             response += f"**ℹ️ General Information:**\n{monograph['summary']}"
         
         return response.strip()
 
+    def _smart_format(self, raw_text: str, query_brand: str = None) -> str:
+        """Parse raw text into structured, concise sections with headers and bullets."""
+        return self._render_monograph(self._parse_monograph(raw_text), query_brand=query_brand)
+
+    def _get_monograph(self, idx: int) -> dict:
+        if idx < len(self.monographs):
+            return self.monographs[idx]
+        return self._parse_monograph(self.documents[idx]['text'])
+
     def search(self, query: str, top_k: int = 1):
+        """Answer a health question (blocking; the FastAPI service uses `search_async`)."""
+        pending = self._begin_search(query, top_k)
+        if isinstance(pending, str):
+            return pending
+        D, I = self._vector_search(pending.enhanced_query, pending.candidates)
+        return self._end_search(pending, D, I)
+
+    async def search_async(self, query: str, top_k: int = 1):
+        """
+        `search` for the event loop. BM25 and formatting run on the CPU pool, but the wait for
+        a micro-batch happens on the loop itself: a pool thread parked on the batcher would cap
+        every batch at CHATBOT_CPU_WORKERS queries, however large HEALTHBOT_BATCH_SIZE is.
+        """
+        pending = await run_cpu(self._begin_search, query, top_k)
+        if isinstance(pending, str):
+            return pending
+        query_vector = self.embedding_cache.get(pending.enhanced_query)
+        if query_vector is not None:
+            D, I = await run_cpu(self._search_vector, query_vector, pending.candidates)
+        else:
+            batch = asyncio.wrap_future(self.batcher.submit((pending.enhanced_query, pending.candidates)))
+            # On timeout wait_for cancels the future, which drops the query from its batch
+            D, I, timings = await asyncio.wait_for(batch, self.batcher.timeout)
+            for name, seconds in timings.items():
+                add_to_request("healthbot", name, seconds)
+        return await run_cpu(self._end_search, pending, D, I)
+
+    def _detect_brand(self, query: str):
+        """Brand name used in the query, if any (first synonym key found)."""
+        for word in query.lower().split():
+            clean = word.strip("?!.,")
+            if clean in self.synonyms:
+                return clean
+        return None
+
+    def _begin_search(self, query: str, top_k: int = 1):
+        """
+        Everything before the vector search: the cached answer, a direct keyword match or a
+        clear BM25 winner come back as the response string, anything else as a _PendingSearch.
+        """
         if not self.index or not self.documents:
             return "I'm sorry, my health knowledge base is currently unavailable."
 
         # 1. Preprocess Query (Synonyms)
         enhanced_query = self._preprocess_query(query)
-        print(f"Original Query: {query} -> Enhanced: {enhanced_query}")
-        
         # Detect if user used a brand name (simple fallback using synonyms dict keys)
-        # We check split words to find the brand
-        query_words = query.lower().split()
-        brand_used = None
-        for word in query_words:
-            clean = word.strip("?!.,")
-            if clean in self.synonyms:
-                 brand_used = clean
-                 break
+        brand_used = self._detect_brand(query)
+
+        # The answer only depends on the enhanced query and the brand shown in the title
+        cache_key = (enhanced_query, brand_used, top_k)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        print(f"Original Query: {query} -> Enhanced: {enhanced_query}")
         
         # 2. KEYWORD PRIORITY SEARCH
         enhanced_words = enhanced_query.lower().split()
@@ -264,29 +732,72 @@ class HealthBot:
             if clean in self.generic_lookup:
                 print(f"Direct Keyword Match found: {clean}")
                 idx = self.generic_lookup[clean]
-                doc = self.documents[idx]
-                return "Here is the information I found:\n\n" + self._smart_format(doc['text'], query_brand=brand_used)
+                response = "Here is the information I found:\n\n" + self._render_monograph(self._get_monograph(idx), query_brand=brand_used)
+                self.response_cache.set(cache_key, response)
+                return response
 
-        # 3. VECTOR SEARCH
-        query_vector = self.model.encode([enhanced_query])
-        
+        # 3. LEXICAL SEARCH (BM25 over the indexed passages): a clear winner skips the encoder
+        # Both indexes hold section passages: fetch several per answer, then group by document
+        candidates = top_k * self.chunk_candidates
+        lexical_hits = []
+        if self.lexical is not None:
+            with stage("healthbot", "bm25"):
+                scores, rows = self.lexical.search(enhanced_query, candidates)
+            # Negated so that, like L2 distances, lower is better
+            lexical_hits = self._group_hits(-scores, rows, candidates)
+        lexical_best = -lexical_hits[0][1] if lexical_hits else 0.0
+        lexical_runner_up = -lexical_hits[1][1] if len(lexical_hits) > 1 else 0.0
+        if lexical_best >= self.lexical_min_score and lexical_best >= self.lexical_margin * lexical_runner_up:
+            print(f"Lexical Match found (BM25 {lexical_best:.1f} vs {lexical_runner_up:.1f})")
+            idx, _, matched = lexical_hits[0]
+            response = "Here is the information I found:\n\n" + \
+                self._render_monograph(self._get_monograph(idx), query_brand=brand_used, only_sections=matched)
+            self.response_cache.set(cache_key, response)
+            return response
+
+        return _PendingSearch(query, enhanced_query, brand_used, top_k, candidates, lexical_hits, lexical_best, cache_key)
+
+    def _search_vector(self, query_vector, candidates: int):
+        with stage("healthbot", "faiss"):
+            return self.index.search(query_vector.reshape(1, -1), candidates)
+
+    def _vector_search(self, enhanced_query: str, candidates: int):
+        """4. VECTOR SEARCH (cached embedding, or micro-batched with concurrent requests)."""
+        query_vector = self.embedding_cache.get(enhanced_query)
+        if query_vector is not None:
+            return self._search_vector(query_vector, candidates)
+        D, I, timings = self.batcher((enhanced_query, candidates))
+        for name, seconds in timings.items():
+            add_to_request("healthbot", name, seconds)
+        return D, I
+
+    def _end_search(self, pending, D, I) -> str:
+        response = self._answer_from_hits(pending, D, I)
+        self.response_cache.set(pending.cache_key, response)
+        return response
+
+    def _answer_from_hits(self, pending, D, I) -> str:
+        query, brand_used, top_k = pending.query, pending.brand_used, pending.top_k
+        lexical_hits, lexical_best = pending.lexical_hits, pending.lexical_best
         # Return only the TOP result to avoid confusion (User requested precision)
-        D, I = self.index.search(np.array(query_vector).astype('float32'), top_k) 
+        vector_hits = self._group_hits(D, I, pending.candidates)
         
         # Threshold Check for Relevance
         # If distance is too high, it means the query is likely off-topic (e.g. "Capital of France")
-        # Calibrated value: Irrelevant queries ~1.8. Relevant ~0.5-0.9. Threshold set to 1.35.
-        # UPDATE: Increased to 1.5 to catch "symptoms of flu" which might be marginally related to Aspirin/Acetaminophen texts
-        if D[0][0] > 1.5:
+        # Whole-document vectors measured irrelevant queries ~1.8 and relevant ~0.5-0.9 (threshold 1.5);
+        # passage distances differ, so the threshold is HEALTHBOT_MAX_DISTANCE (scripts/calibrate_distance.py)
+        # A strong BM25 match (e.g. a rare drug name the encoder doesn't know) still counts as on-topic
+        vector_relevant = vector_hits and vector_hits[0][1] <= self.max_distance
+        if not vector_relevant and lexical_best < self.lexical_min_score:
             return "I'm sorry, I can only help with questions related to medicines and health conditions. 🩺"
 
+        # Show the sections whose passages matched rather than the whole label
         results = []
-        for i in range(top_k):
-            idx = I[0][i]
-            if idx < len(self.documents):
-                doc = self.documents[idx]
-                formatted_text = self._smart_format(doc['text'], query_brand=brand_used)
-                results.append(formatted_text)
+        rankings = (vector_hits, lexical_hits) if vector_relevant else (lexical_hits,)
+        for idx, matched in self._fuse(*rankings, top_k=top_k):
+            formatted_text = self._render_monograph(self._get_monograph(idx), query_brand=brand_used,
+                                                    only_sections=matched)
+            results.append(formatted_text)
                 
         if results:
             # Check if query implies looking for condition symptoms rather than drug info
@@ -0,0 +1,93 @@
+import re
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a keyword trie; optional tails are greedy so the longest keyword wins."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return '(?:' + body + ')?' if '' in node else body
+
+
+class KeywordAutomaton:
+    """
+    Multi-keyword matcher compiled once from a keyword trie.
+
+    The trie becomes one alternation regex (longest keyword first), and a single `findall`
+    scans the text in the C regex engine, skipping ahead to characters that can start a
+    keyword. Two tables make its non-overlapping matches give the same answer as
+    `[k for k in keywords if k in text]`:
+
+    - every keyword contained in a matched keyword (prefixes, infixes, suffixes) counts too;
+    - a keyword that starts inside a match and runs past its end begins with a suffix of the
+      matched keyword and continues with the character after the match. Only when such a
+      (keyword, next character) pair shows up are the matches walked again with their
+      positions, re-trying the pattern at those offsets.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        ids = {k: kid for kid, k in enumerate(self.keywords)}
+
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        # Each match is reported with the character after it, which decides whether it needs a restart
+        self._pattern = re.compile('(' + _trie_pattern(trie) + ')(?=(.?))', re.DOTALL) if trie else None
+
+        # {keyword: ids of every keyword it contains (itself included)}
+        self._contained_ids = {}
+        # {keyword: {next character: offsets inside the keyword where a longer keyword may start}}
+        self._restarts = {}
+        for keyword in self.keywords:
+            n = len(keyword)
+            self._contained_ids[keyword] = frozenset(
+                ids[keyword[i:j]] for i in range(n) for j in range(i + 1, n + 1) if keyword[i:j] in ids)
+            restarts = {}
+            for i in range(1, n):
+                node = trie
+                for ch in keyword[i:]:
+                    node = node.get(ch)
+                    if node is None:
+                        break
+                else:
+                    for ch in node:
+                        if ch:
+                            restarts.setdefault(ch, []).append(i)
+            if restarts:
+                self._restarts[keyword] = restarts
+        # (keyword, next character) pairs after which a longer keyword may start inside the match
+        self._restart_pairs = frozenset((k, ch) for k, restarts in self._restarts.items() for ch in restarts)
+
+    def find_ids(self, text: str) -> set:
+        if self._pattern is None:
+            return set()
+        matches = self._pattern.findall(text)
+        if self._restart_pairs.isdisjoint(matches):
+            # Common case: no keyword can overlap the end of a match, so the matches say it all
+            return set().union(*map(self._contained_ids.__getitem__, dict(matches)))
+
+        found = set()
+        contained, all_restarts, pattern = self._contained_ids, self._restarts, self._pattern
+        for match in pattern.finditer(text):
+            keyword, after = match.groups()
+            found |= contained[keyword]
+            offsets = all_restarts.get(keyword, {}).get(after)
+            if offsets:
+                start = match.start()
+                for i in offsets:
+                    longer = pattern.match(text, start + i)
+                    if longer:
+                        found |= contained[longer.group(1)]
+        return found
+
+    def matches(self, text: str) -> bool:
+        """True if any keyword occurs in the text (one scan, stops at the first hit)."""
+        return self._pattern is not None and self._pattern.search(text) is not None
+
+    def find(self, text: str) -> set:
+        return {self.keywords[kid] for kid in self.find_ids(text)}
@@ -0,0 +1,94 @@
+import json
+import os
+import re
+
+import numpy as np
+from scipy import sparse
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of passages.
+
+    The BM25 weight of every (passage, term) pair is computed once at build time and
+    stored as a sparse passages x terms matrix (CSC, so a query only touches the columns
+    of its own terms). Scoring a query is then one sparse matrix-vector product.
+    Rows are addressed by the caller's ids (HealthBot uses the FAISS vector ids), and
+    ids without a passage simply score 0.
+    """
+
+    def __init__(self, weights, vocabulary: dict, meta: dict = None):
+        self.weights = weights.tocsc()
+        self.vocabulary = vocabulary  # term -> column
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, passages, n_rows: int, k1: float = 1.2, b: float = 0.75, meta: dict = None):
+        """`passages` are (row id, text) pairs; the matrix gets `n_rows` rows."""
+        vocabulary = {}
+        rows, cols = [], []
+        lengths = np.zeros(n_rows, dtype='float64')
+        for row, text in passages:
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            rows.extend([row] * len(tokens))
+            cols.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+
+        # Duplicate (row, col) entries are summed: term frequencies
+        tf = sparse.csr_matrix(
+            (np.ones(len(rows), dtype='float64'), (np.asarray(rows, dtype='int64'), np.asarray(cols, dtype='int64'))),
+            shape=(n_rows, len(vocabulary)),
+        )
+        tf.sum_duplicates()
+
+        n_passages = max(int(np.count_nonzero(lengths)), 1)
+        avg_length = lengths.sum() / n_passages or 1.0
+        df = np.bincount(tf.indices, minlength=len(vocabulary))
+        idf = np.log1p((n_passages - df + 0.5) / (df + 0.5))
+
+        # tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len)), times the term's idf
+        row_of = np.repeat(np.arange(n_rows), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * lengths[row_of] / avg_length)
+        tf.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        return cls(tf, vocabulary, meta)
+
+    def save(self, path_prefix: str):
+        """Atomically write `<prefix>.npz` (weights) and `<prefix>.json` (vocabulary + meta)."""
+        os.makedirs(os.path.dirname(path_prefix) or ".", exist_ok=True)
+        tmp = f"{path_prefix}.{os.getpid()}.tmp"
+        sparse.save_npz(tmp + ".npz", self.weights)
+        with open(tmp + ".json", 'w', encoding='utf-8') as f:
+            json.dump({"meta": self.meta, "vocabulary": self.vocabulary}, f, ensure_ascii=False)
+        os.replace(tmp + ".npz", path_prefix + ".npz")
+        os.replace(tmp + ".json", path_prefix + ".json")
+
+    @classmethod
+    def load(cls, path_prefix: str):
+        with open(path_prefix + ".json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(sparse.load_npz(path_prefix + ".npz"), data["vocabulary"], data["meta"])
+
+    @staticmethod
+    def exists(path_prefix: str) -> bool:
+        return os.path.exists(path_prefix + ".npz") and os.path.exists(path_prefix + ".json")
+
+    def scores(self, text: str):
+        """BM25 score of every row for the query `text` (zeros if no query term is indexed)."""
+        columns = [self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary]
+        if not columns:
+            return np.zeros(self.weights.shape[0], dtype='float64')
+        terms, counts = np.unique(columns, return_counts=True)
+        return self.weights[:, terms] @ counts.astype('float64')
+
+    def search(self, text: str, k: int):
+        """(scores, row ids) of the `k` best matching rows, best first, in FAISS's (1, k) layout."""
+        scores = self.scores(text)
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.lexsort((matched, -scores[matched]))]
+        return scores[order].reshape(1, -1), order.reshape(1, -1)
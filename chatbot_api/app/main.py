@@ -1,8 +1,10 @@
 import os
+import json
 import django
 import re
 # Trigger reload (Force Update 9)
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import sys
@@ -18,10 +20,16 @@ sys.path.append(str(BASE_DIR))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pharmacy.settings')
 django.setup()
 
+from pharmacy import metrics
+metrics.install_query_counter()
+
 # Import Bots (after django setup)
+# HealthBot (transformer + FAISS) is imported and built by the warm-up thread, not here
 from .pharmacy_bot import PharmacyBot
-from .health_bot import HealthBot
 from .router_model import RouterModel
+from .warmup import BackgroundLoader, READY, FAILED
+from . import executors
+from . import prescription_parser
 
 app = FastAPI()
 
@@ -44,72 +52,165 @@ class ChatRequest(BaseModel):
 pharmacy_bot = PharmacyBot()
 router_model = RouterModel()
 
-try:
-    health_bot = HealthBot()
-except Exception as e:
-    print(f"Failed to load HealthBot: {e}")
-    health_bot = None
+def load_health_bot():
+    from .health_bot import HealthBot
+    return HealthBot()
+
+# Loaded in the background from startup; health questions wait at most HEALTHBOT_WARMUP_WAIT
+# seconds for it before getting a "warming up" reply
+health_bot_loader = BackgroundLoader("HealthBot", load_health_bot)
+HEALTHBOT_WARMUP_WAIT = float(os.getenv("HEALTHBOT_WARMUP_WAIT", "3"))
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    stats, token = metrics.start_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.finish_request("fastapi", request.method, route.path if route else "<unmatched>", status, stats, token)
+
+@app.get("/metrics")
+def read_metrics(request: Request):
+    # Local scrapes only (METRICS_ALLOWED_IPS)
+    if not metrics.is_allowed(request.client.host if request.client else ""):
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def start_warmup():
+    health_bot_loader.start()
+
+@app.get("/health/live")
+def liveness():
+    # The process is up and the event loop is answering
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    """503 until every component has finished loading; a component that failed leaves the service degraded."""
+    components = {
+        "router": {"state": READY},
+        "pharmacy_bot": {"state": READY},
+        "health_bot": health_bot_loader.status(),
+    }
+    states = [c["state"] for c in components.values()]
+    if any(state not in (READY, FAILED) for state in states):
+        status, code = "starting", 503
+    elif FAILED in states:
+        status, code = "degraded", 200
+    else:
+        status, code = "ready", 200
+    return JSONResponse({"status": status, "components": components}, status_code=code)
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    executors.shutdown()
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "service": "Pharmacy AI Backend"}
 
+def small_talk_reply(message: str) -> str:
+    msg = message.lower()
+    if any(x in msg for x in ["thank", "thx", "ty"]):
+        response = "You're welcome! Let me know if you need anything else. 💊"
+    elif "bye" in msg or "goodbye" in msg:
+        response = "Goodbye! Stay healthy! 👋"
+    elif any(x in msg for x in ["hi", "hello", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
+        response = "Hello! I am your AI Pharmacy Assistant. How can I help you today? 🤖"
+    elif any(x in msg for x in ["super", "great", "awesome", "perfect", "cool", "nice"]):
+         response = "Glad to hear it! Let me know if you need anything else. 🌟"
+    elif "how are you" in msg:
+         response = "I'm functioning perfectly, thanks for asking! 🔋 How can I help you?"
+    elif any(x in msg for x in ["how is life", "how's life", "how are things", "how is it going", "hows life"]):
+         response = "Life is great in the digital world! 🌐 Ready to help you with your health needs."
+    elif any(x in msg for x in ["whats up", "what's up", "wassup"]):
+         response = "Not much, just here waiting to help you find the best medicines! 💊"
+    elif any(x in msg for x in ["who built", "created you", "creator", "built u", "created u"]):
+        response = "I was built by a team of forward-thinking developers to make healthcare easier for you! 🚀"
+    elif any(x in msg for x in ["real person", "human", "robot"]):
+        response = "I am a virtual assistant, not a real person. But I'm always here to help you find medicines and health info! 🤖"
+    elif any(x in msg for x in ["real person", "human", "robot"]):
+        response = "I am a virtual assistant, not a real person. But I'm always here to help you find medicines and health info! 🤖"
+    elif re.search(r"who\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", msg):
+        response = "I am an AI assistant designed to help you with pharmacy products and health information."
+    else:
+        response = "I'm here to help! Feel free to ask about medicines or health advice."
+    return response
+
+async def answer(intent: str, request: ChatRequest) -> str:
+    if intent == "pharmacy":
+        return await executors.run_db(pharmacy_bot.process_instruction, request.message, session_id=request.session_id, user_id=request.user_id)
+    if intent == "small_talk":
+        return small_talk_reply(request.message)
+    health_bot = await health_bot_loader.wait(HEALTHBOT_WARMUP_WAIT)
+    if health_bot:
+        return await health_bot.search_async(request.message)
+    if health_bot_loader.state != FAILED:
+        return "⏳ My health knowledge base is still warming up. Please ask again in a few seconds."
+    return "I apologize, but my health information module is currently offline."
+
+def route(message: str) -> str:
+    # Routing and small talk are a few microseconds of string work: run them on the event loop
+    with metrics.stage("router", "routing"):
+        return router_model.route_query(message)
+
 @app.post("/chat")
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     try:
-        intent = router_model.route_query(request.message)
-        
-        if intent == "pharmacy":
-            response = pharmacy_bot.process_instruction(request.message, session_id=request.session_id, user_id=request.user_id)
-        elif intent == "small_talk":
-            msg = request.message.lower()
-            if any(x in msg for x in ["thank", "thx", "ty"]):
-                response = "You're welcome! Let me know if you need anything else. 💊"
-            elif "bye" in msg or "goodbye" in msg:
-                response = "Goodbye! Stay healthy! 👋"
-            elif any(x in msg for x in ["hi", "hello", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
-                response = "Hello! I am your AI Pharmacy Assistant. How can I help you today? 🤖"
-            elif any(x in msg for x in ["super", "great", "awesome", "perfect", "cool", "nice"]):
-                 response = "Glad to hear it! Let me know if you need anything else. 🌟"
-            elif "how are you" in msg:
-                 response = "I'm functioning perfectly, thanks for asking! 🔋 How can I help you?"
-            elif any(x in msg for x in ["how is life", "how's life", "how are things", "how is it going", "hows life"]):
-                 response = "Life is great in the digital world! 🌐 Ready to help you with your health needs."
-            elif any(x in msg for x in ["whats up", "what's up", "wassup"]):
-                 response = "Not much, just here waiting to help you find the best medicines! 💊"
-            elif any(x in msg for x in ["who built", "created you", "creator", "built u", "created u"]):
-                response = "I was built by a team of forward-thinking developers to make healthcare easier for you! 🚀"
-            elif any(x in msg for x in ["real person", "human", "robot"]):
-                response = "I am a virtual assistant, not a real person. But I'm always here to help you find medicines and health info! 🤖"
-            elif any(x in msg for x in ["real person", "human", "robot"]):
-                response = "I am a virtual assistant, not a real person. But I'm always here to help you find medicines and health info! 🤖"
-            elif re.search(r"who\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", msg):
-                response = "I am an AI assistant designed to help you with pharmacy products and health information."
-            else:
-                response = "I'm here to help! Feel free to ask about medicines or health advice."
-        else:
-            if health_bot:
-                response = health_bot.search(request.message)
-            else:
-                response = "I apologize, but my health information module is currently offline."
-                
+        intent = route(request.message)
+        response = await answer(intent, request)
         return {"response": response, "intent": intent}
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"response": f"INTERNAL ERROR: {str(e)}", "intent": "error"}
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def split_sections(text: str) -> list:
+    """Split an answer before each bold header ("**✅ Uses:**", ...); the parts join back to `text`."""
+    return [part for part in re.split(r'(?=\n\n\*\*)', text) if part]
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Same answer as /chat as Server-Sent Events: `intent` at once, then `section`s, then `done`."""
+    async def events():
+        try:
+            intent = route(request.message)
+            yield sse_event("intent", {"intent": intent})
+            response = await answer(intent, request)
+            for part in split_sections(response):
+                yield sse_event("section", {"text": part})
+            yield sse_event("done", {})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"error": f"INTERNAL ERROR: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 from typing import Optional
 
 @app.post("/prescription")
-def process_prescription(file: UploadFile = File(...), session_id: Optional[str] = Form(None)):
+async def process_prescription(file: UploadFile = File(...), session_id: Optional[str] = Form(None)):
     try:
-        # Retrieve content
-        content = file.file.read()
-        filename = file.filename
-        
-        # Process using Pharmacy Bot
-        result = pharmacy_bot.process_prescription(filename, content, session_id=session_id)
+        # Retrieve content (one byte past the limit is enough to reject it)
+        content = await file.read(prescription_parser.MAX_BYTES + 1)
+        filename = file.filename or ""
+
+        # Extract the text in a parser process, then match it against the catalog
+        try:
+            text = await prescription_parser.parse(content)
+        except prescription_parser.PrescriptionError as e:
+            return {"products": [], "message": str(e)}
+        result = await executors.run_db(pharmacy_bot.process_prescription, filename, content, session_id=session_id, text=text)
         return result
     except Exception as e:
         import traceback
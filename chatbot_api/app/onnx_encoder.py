@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(__file__), '../models/all-MiniLM-L6-v2-onnx')
+DEFAULT_MODEL_PATH = os.path.join(DEFAULT_MODEL_DIR, 'model.int8.onnx')
+
+
+class OnnxEncoder:
+    """
+    Stand-in for SentenceTransformer.encode that runs an ONNX export of the encoder
+    (chatbot_api/scripts/export_onnx.py, int8 weights by default) on onnxruntime's CPU
+    provider. It reproduces the all-MiniLM-L6-v2 pipeline: tokenize (truncated to
+    max_seq_length) -> transformer -> mean pooling over the attention mask -> L2 normalise.
+
+    The model directory holds the .onnx file(s), tokenizer.json and encoder.json
+    (written by the export script). Needs onnxruntime and tokenizers, but not torch.
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = os.path.dirname(model_path)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found (run chatbot_api/scripts/export_onnx.py)")
+        with open(os.path.join(model_dir, 'encoder.json'), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.model_name = self.config['model']
+        self.model_file = os.path.basename(model_path)
+        self.max_seq_length = self.config['max_seq_length']
+        self.batch_size = batch_size
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads  # 0 = one per core
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        pad_token = self.config.get('pad_token', '[PAD]')
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['dimension']
+
+    def _encode_batch(self, sentences: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(sentences)
+        input_ids = np.array([e.ids for e in encodings], dtype='int64')
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype='int64')
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]  # (batch, tokens, dimension)
+
+        mask = attention_mask[..., None].astype('float32')
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size: int = None, **kwargs) -> np.ndarray:
+        """float32 embeddings, one row per sentence (a single vector for a single string)."""
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        if not sentences:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype='float32')
+
+        # Longest first, so each batch pads to similar lengths; results go back in input order
+        batch_size = batch_size or self.batch_size
+        order = np.argsort([-len(s) for s in sentences], kind='stable')
+        embeddings = np.empty((len(sentences), self.get_sentence_embedding_dimension()), dtype='float32')
+        for start in range(0, len(sentences), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([sentences[i] for i in batch])
+        return embeddings[0] if single else embeddings
@@ -1,9 +1,14 @@
-from store.models import Medicine
-from django.db.models import Q
 import random
 import difflib
 import re
 
+from pharmacy.metrics import timed
+from store.services import cart_owner, get_cart_queryset, get_cart_summary, get_cart_total
+
+from .catalog_index import CatalogIndex
+from .fuzzy import FuzzyMatcher, close_match
+from .session_store import SessionManager, get_session_store
+
 # Common Drug Aliases (Synonyms/Slang -> Official Name)
 MEDICINE_ALIASES = {
     # Painkillers
@@ -53,18 +58,28 @@ SEARCH_INTENT_KEYWORDS = [
     "medicine", "drug", "tablet", "capsule", "syrup", "pill"
 ]
 
+# Words that typo correction snaps user input to
+TYPO_TARGET_WORDS = SEARCH_INTENT_KEYWORDS + ["hello", "hi", "help", "cart", "remove", "add", "checkout", "open", "close", "hours", "time", "make", "dont", "prescription", "lost"]
+
+# Fuzzy matchers are built once; catalog names are matched through CatalogIndex
+TYPO_MATCHER = FuzzyMatcher(TYPO_TARGET_WORDS)
+ALIAS_MATCHER = FuzzyMatcher(MEDICINE_ALIASES.keys())
+
 class PharmacyBot:
     def __init__(self):
-        self.sessions = {} # {session_id: {"last_search": [Medicine], "last_added": Medicine}}
+        self.catalog = CatalogIndex()
+        # {session_id: {"last_search": [Medicine], "last_added": Medicine, "pending_quantity": int}}
+        # Stored as medicine ids in a shared backend (see session_store.py)
+        self.sessions = SessionManager(get_session_store(), self.catalog)
 
+    @timed("pharmacy", "matching")
     def find_medicines(self, text: str) -> list:
         """Helper to find medicines based on text."""
-        medicines = Medicine.objects.all()
         found_medicines = []
+        found_names = set()
+        description_terms = []
         
         query_words = text.split()
-        all_medicines = list(medicines) 
-        all_med_names = [m.name.lower() for m in all_medicines if m.name]
         
         for word in query_words:
             if len(word) <= 3: continue 
@@ -75,30 +90,32 @@ class PharmacyBot:
             if word in MEDICINE_ALIASES:
                 candidates.add(MEDICINE_ALIASES[word])
                 
-            alias_matches = difflib.get_close_matches(word, MEDICINE_ALIASES.keys(), n=1, cutoff=0.8)
-            if alias_matches:
-                candidates.add(MEDICINE_ALIASES[alias_matches[0]])
-            
-            db_matches = difflib.get_close_matches(word, all_med_names, n=1, cutoff=0.7)
-            if db_matches:
-                candidates.add(db_matches[0])
-
-            # Priority Search: Name Matches First
-            query_name = Q()
-            query_desc = Q()
-            for term in candidates:
-                query_name |= Q(name__icontains=term)
-                query_desc |= Q(description__icontains=term)
+            alias_match = ALIAS_MATCHER.best(word, 0.8)
+            if alias_match:
+                candidates.add(MEDICINE_ALIASES[alias_match])
             
+            db_match = self.catalog.closest_name(word, 0.7)
+            if db_match:
+                candidates.add(db_match)
+
+            # Priority Search: Name Matches First (served from the in-memory catalog index)
             # 1. Try finding by Name (Precision)
-            matches = medicines.filter(query_name)
+            matches = self.catalog.search_names(candidates)
             
-            # 2. If no name matches, fallback to Description (Recall for symptoms like "Headache")
-            if not matches.exists():
-                matches = medicines.filter(query_desc)
+            # 2. If no name matches, fallback to Description (Recall for symptoms like "Headache"),
+            # collected so all such words are looked up in a single full-text query
+            if not matches:
+                description_terms.extend(candidates)
                 
             for p in matches:
-                 if p.name not in [fp.name for fp in found_medicines]:
+                 if p.name not in found_names:
+                    found_names.add(p.name)
+                    found_medicines.append(p)
+
+        if description_terms:
+            for p in self.catalog.search_descriptions(description_terms):
+                if p.name not in found_names:
+                    found_names.add(p.name)
                     found_medicines.append(p)
         
         if found_medicines:
@@ -107,15 +124,12 @@ class PharmacyBot:
              
         return found_medicines
 
+    @timed("pharmacy", "typo_correction")
     def correct_typos(self, text: str) -> str:
         """Corrects typos in common keywords using fuzzy matching."""
         words = text.split()
         corrected_words = []
         
-        # Combine intent keywords with common stop words to avoid false positives on short words if needed
-        # But here we focus on intent keywords
-        target_words = SEARCH_INTENT_KEYWORDS + ["hello", "hi", "help", "cart", "remove", "add", "checkout", "open", "close", "hours", "time", "make", "dont", "prescription", "lost"]
-        
         for word in words:
             # Skip numbers or very short words unless specific known ones
             if len(word) < 3 and word not in ["hi", "no", "ok"]: 
@@ -123,16 +137,16 @@ class PharmacyBot:
                 continue
                 
             # If word is already correct, keep it
-            if word.lower() in target_words:
+            if word.lower() in TYPO_MATCHER:
                 corrected_words.append(word)
                 continue
                 
             # Check for close matches
-            matches = difflib.get_close_matches(word.lower(), target_words, n=1, cutoff=0.7)
-            if matches:
+            match = TYPO_MATCHER.best(word.lower(), 0.7)
+            if match:
                  # Verify it's not a medicine name before replacing? 
                  # Risky if medicine names look like keywords, but unlikely for "havr" -> "have"
-                 corrected_words.append(matches[0])
+                 corrected_words.append(match)
             else:
                  corrected_words.append(word)
                  
@@ -164,16 +178,8 @@ class PharmacyBot:
 
         # 0.5 Checkout Intent (High Priority)
         if "checkout" in text or "pay" in text or "place order" in text:
-            from store.models import CartItem
-            cart_total = 0
             # Ensure we look at the SESSION specific cart
-            if user_id:
-                 cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(user_id=user_id))
-            elif session_id:
-                cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-            else:
-                # Fallback (should be avoided in multi-user)
-                 cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+            cart_total = get_cart_total(get_cart_queryset(user_id=user_id, session_id=session_id))
             
             if cart_total > 0:
                 return f"Your total is ${cart_total:.2f}.\n\nPlease complete your payment securely here:\n\n[ Pay Now ](/checkout/)\n\nOnce paid, your order will be processed! 💳"
@@ -196,7 +202,6 @@ class PharmacyBot:
                  if found:
                      msg = "Added the following to your cart:\n"
                      total_added = 0
-                     from store.models import CartItem
                      
                      for med in found:
                          self.add_to_cart_direct(med, session_id=session_id, user_id=user_id) # Reuse method (it updates context, which is fine)
@@ -204,10 +209,7 @@ class PharmacyBot:
                          total_added += 1
                      
                      # Get updated total
-                     if session_id:
-                         cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-                     else:
-                         cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+                     cart_total = get_cart_total(get_cart_queryset(user_id=user_id, session_id=session_id))
 
                      msg += f"\nTotal Items: {total_added}\nCurrent Cart Total: ${cart_total:.2f}"
                      return msg
@@ -227,16 +229,10 @@ class PharmacyBot:
         if ("remove" in text or "delete" in text or "dlete" in text or "cancel" in text or "clear" in text or "empty" in text):
             # Check for "Remove All" / "Clear Cart"
             if "all" in text or "clear" in text or "empty" in text:
-                 from store.models import CartItem
-                 if user_id:
-                     CartItem.objects.filter(user_id=user_id).delete()
-                 elif session_id:
-                     CartItem.objects.filter(session_id=session_id).delete()
-                     if session_id in self.sessions:
-                         self.sessions[session_id]["last_added"] = None
-                         self.sessions[session_id]["last_search"] = []
-                 else:
-                     CartItem.objects.filter(session_id__isnull=True).delete()
+                 get_cart_queryset(user_id=user_id, session_id=session_id).delete()
+                 if not user_id and session_id in self.sessions:
+                     self.sessions[session_id]["last_added"] = None
+                     self.sessions[session_id]["last_search"] = []
                  
                  return "Your cart has been cleared. 🗑️"
 
@@ -354,11 +350,11 @@ class PharmacyBot:
                 
                 # If no ordinal found, try Fuzzy Name Matching against the options
                 if not target_med:
-                    # 1. Standard DiffLib
-                    possible_matches = difflib.get_close_matches(text, [m.name.lower() for m in last_search], n=1, cutoff=0.6)
-                    if possible_matches:
+                    # 1. Fuzzy name match (same scoring as difflib)
+                    possible_match = close_match(text, [m.name.lower() for m in last_search], cutoff=0.6)
+                    if possible_match:
                         for m in last_search:
-                            if m.name.lower() == possible_matches[0]:
+                            if m.name.lower() == possible_match:
                                 target_med = m
                                 break
                     
@@ -430,33 +426,20 @@ class PharmacyBot:
                              return self.add_to_cart_direct(target_med, quantity=new_qty, session_id=session_id, user_id=user_id)
     
                      # 2. Fallback: Update Last Added Item (Legacy behavior) OR DB Fallback
-                     from store.models import CartItem
                      last_added_med = context.get("last_added")
+                     cart_items = get_cart_queryset(user_id=user_id, session_id=session_id)
                      
                      # If memory is empty (server restart), try to find the latest item from DB
                      if not last_added_med:
-                         item_query = CartItem.objects.all()
-                         if user_id:
-                             item_query = item_query.filter(user_id=user_id)
-                         elif session_id:
-                             item_query = item_query.filter(session_id=session_id)
-                         else:
-                             item_query = item_query.filter(session_id__isnull=True)
-                             
                          # Get most recently created item
+                         item_query = cart_items
                          latest_item = item_query.order_by('-id').first()
                          if latest_item:
                              last_added_med = latest_item.medicine
 
                      if last_added_med:
                          # Find item in cart
-                         item_query = CartItem.objects.filter(medicine=last_added_med)
-                         if user_id:
-                             item_query = item_query.filter(user_id=user_id)
-                         elif session_id:
-                             item_query = item_query.filter(session_id=session_id)
-                         else:
-                             item_query = item_query.filter(session_id__isnull=True)
+                         item_query = cart_items.filter(medicine=last_added_med)
                          
                          if item_query.exists():
                              item = item_query.first()
@@ -464,12 +447,7 @@ class PharmacyBot:
                              item.save()
                              
                              # Recalculate Total
-                             if user_id:
-                                 cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(user_id=user_id))
-                             elif session_id:
-                                 cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-                             else:
-                                 cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+                             cart_total = get_cart_total(cart_items)
                                  
                              return f"Updated {item.medicine.name} to {new_qty} in your cart.\n\nCurrent Cart Total: ${cart_total}"
         
@@ -553,27 +531,17 @@ class PharmacyBot:
                  is_view_cart = True
                  
         if is_view_cart:
-            from store.models import CartItem
-            
-            cart_items = []
-            if user_id:
-                cart_items = CartItem.objects.filter(user_id=user_id)
-            elif session_id:
-                cart_items = CartItem.objects.filter(session_id=session_id)
-            else:
-                cart_items = CartItem.objects.filter(session_id__isnull=True)
+            # Lines, medicines and totals in one query
+            cart = get_cart_summary(get_cart_queryset(user_id=user_id, session_id=session_id))
             
-            if not cart_items.exists():
+            if not cart:
                 return "Your cart is currently empty. 🛒"
             
             msg = "Here is what you have in your cart:\n\n"
-            total = 0
-            for item in cart_items:
-                item_total = item.get_total_price()
-                total += item_total
-                msg += f"- {item.quantity} x {item.medicine.name} (${item_total:.2f})\n"
+            for item in cart.items:
+                msg += f"- {item.quantity} x {item.medicine.name} (${item.line_total:.2f})\n"
             
-            msg += f"\n**Total: ${total:.2f}**\n\n"
+            msg += f"\n**Total: ${cart.total:.2f}**\n\n"
             msg += "[ Checkout Now ](/checkout/)"
             return msg
 
@@ -581,14 +549,7 @@ class PharmacyBot:
 
     def add_to_cart_direct(self, medicine, quantity=1, session_id=None, user_id=None) -> str:
         from store.models import CartItem
-        # Filter by session_id
-        if user_id:
-             item, created = CartItem.objects.get_or_create(medicine=medicine, user_id=user_id)
-        elif session_id:
-            item, created = CartItem.objects.get_or_create(medicine=medicine, session_id=session_id)
-        else:
-            # Fallback for legacy global behavior (shouldn't happen ideally)
-            item, created = CartItem.objects.get_or_create(medicine=medicine, session_id__isnull=True)
+        item, created = CartItem.objects.get_or_create(medicine=medicine, **cart_owner(user_id, session_id))
             
         if not created:
             item.quantity += quantity
@@ -602,18 +563,12 @@ class PharmacyBot:
             self.sessions[session_id]["last_added"] = medicine
         
         # Calculate Total for THIS SESSION
-        # Calculate Total for THIS SESSION
-        if user_id:
-             cart_Total = sum(i.get_total_price() for i in CartItem.objects.filter(user_id=user_id))
-        elif session_id:
-            cart_Total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-        else:
-            cart_Total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+        cart_Total = get_cart_total(get_cart_queryset(user_id=user_id, session_id=session_id))
              
         return f"{quantity} x {medicine.name} added to your cart.\n\nItem Price: ${medicine.price * quantity:.2f}\nCurrent Cart Total: ${cart_Total:.2f}"
 
     def manage_cart(self, text: str, action: str, session_id: str = None, user_id: int = None) -> str:
-        from store.models import CartItem, Medicine 
+        from store.models import CartItem
         
         words = text.split()
         quantity = 0 
@@ -633,10 +588,9 @@ class PharmacyBot:
         if not explicit_qty:
             quantity = 1
                 
-        medicines = Medicine.objects.all()
         target_med = None
         # Sort by length to match "Panadol Extra" before "Panadol"
-        all_medicines = sorted(list(medicines), key=lambda x: len(x.name), reverse=True)
+        all_medicines = sorted(self.catalog.all(), key=lambda x: len(x.name), reverse=True)
         
         for med in all_medicines:
              # Space-padded check to avoid partial matches like "Pan" in "Panadol"
@@ -653,12 +607,7 @@ class PharmacyBot:
              return "I couldn't identify the medicine name to available. Please say the exact product name, e.g., 'Add Panadol to cart'."
 
         if action == "add":
-            if user_id:
-                item, created = CartItem.objects.get_or_create(medicine=target_med, user_id=user_id)
-            elif session_id:
-                item, created = CartItem.objects.get_or_create(medicine=target_med, session_id=session_id)
-            else:
-                item, created = CartItem.objects.get_or_create(medicine=target_med, session_id__isnull=True)
+            item, created = CartItem.objects.get_or_create(medicine=target_med, **cart_owner(user_id, session_id))
                 
             if not created:
                 item.quantity += quantity
@@ -671,35 +620,20 @@ class PharmacyBot:
                 self.sessions[session_id]["last_search"] = []
                 self.sessions[session_id]["last_added"] = target_med
             
-            if user_id:
-                cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(user_id=user_id))
-            elif session_id:
-                cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-            else:
-                cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+            cart_total = get_cart_total(get_cart_queryset(user_id=user_id, session_id=session_id))
                 
             return f"{quantity} x {target_med.name} added to your cart.\n\nItem Price: ${target_med.price * quantity:.2f}\nCurrent Cart Total: ${cart_total:.2f}"
             
         elif action == "remove":
             try:
-                if user_id:
-                     item = CartItem.objects.get(medicine=target_med, user_id=user_id)
-                elif session_id:
-                    item = CartItem.objects.get(medicine=target_med, session_id=session_id)
-                else:
-                    item = CartItem.objects.get(medicine=target_med, session_id__isnull=True)
+                item = get_cart_queryset(user_id=user_id, session_id=session_id).get(medicine=target_med)
                 
                 # Logic: If user specified a quantity (e.g. "remove 2") and it's less than what's in cart, decrement.
                 if explicit_qty and quantity < item.quantity:
                      item.quantity -= quantity
                      item.save()
                      
-                     if user_id:
-                         cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(user_id=user_id))
-                     elif session_id:
-                         cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id=session_id))
-                     else:
-                         cart_total = sum(i.get_total_price() for i in CartItem.objects.filter(session_id__isnull=True))
+                     cart_total = get_cart_total(get_cart_queryset(user_id=user_id, session_id=session_id))
                          
                      return f"Removed {quantity} x {target_med.name} from your cart.\nRemaining: {item.quantity}\nCurrent Cart Total: ${cart_total:.2f}"
                 else:
@@ -715,36 +649,20 @@ class PharmacyBot:
                 
         return "I didn't understand that cart command."
 
-    def process_prescription(self, filename: str, content: bytes, session_id: str = None) -> dict:
+    def process_prescription(self, filename: str, content: bytes, session_id: str = None, text: str = None) -> dict:
         filename = filename.lower()
-        
-        # Try to decode content as text (assuming these are dummy text-based PDFs for the demo)
-        try:
-            text_content = content.decode('utf-8', errors='ignore').lower()
-        except:
-            text_content = ""
-            
-        all_medicines = list(Medicine.objects.all())
-        found_meds = []
-        
-        # 1. Exact Name / Alias Matching in text_content
-        # We iterate over all medicines and check if their name appears in the file
-        for med in all_medicines:
-            # Check Name
-            if med.name.lower() in text_content:
-                if med not in found_meds:
-                    found_meds.append(med)
-            
-            # Check Aliases (Optional, but good for "Tylenol" -> Paracetamol)
-            # In a real app, we'd have a reverse alias map. For now, we rely on the PharmacyBot's simple alias map if needed,
-            # but simplest is just checking the DB names.
-            
+
+        # `text` is the output of prescription_parser (extracted in a worker process);
+        # without it, read the upload as plain text
+        if text is None:
+            text = content.decode('utf-8', errors='ignore').lower()
+
+        # 1. Medicine names found in the prescription text (one automaton pass over the text)
+        found_meds = self.catalog.find_names_in(text)
+
         # 2. Fallback: Check filename if text content turned up nothing (e.g. valid "image" but we rely on filename for demo)
         if not found_meds:
-            for med in all_medicines:
-                if med.name.lower() in filename:
-                     if med not in found_meds:
-                        found_meds.append(med)
+            found_meds = self.catalog.find_names_in(filename)
 
         # 3. Construct Response
         if not found_meds:
@@ -0,0 +1,116 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+# Each upload is parsed in a process of its own: a huge or malformed PDF can use a lot of CPU
+# and memory, and a stuck parse is killed after PRESCRIPTION_TIMEOUT seconds without
+# affecting the other uploads being parsed.
+MAX_BYTES = int(os.getenv("PRESCRIPTION_MAX_BYTES", str(5 * 1024 * 1024)))
+MAX_PAGES = int(os.getenv("PRESCRIPTION_MAX_PAGES", "10"))
+TIMEOUT = float(os.getenv("PRESCRIPTION_TIMEOUT", "8"))
+WORKERS = int(os.getenv("PRESCRIPTION_WORKERS", "2"))
+
+TIMEOUT_MESSAGE = "We could not read this file in time. Please upload a smaller or clearer copy."
+
+
+class PrescriptionError(ValueError):
+    """The upload was rejected; the message is shown to the user."""
+
+
+def extract_text(content: bytes, max_pages: int = MAX_PAGES) -> str:
+    """
+    Lowercased text of an uploaded prescription. Real PDFs go through pypdf (which
+    inflates compressed content streams); anything else is read as plain text.
+    Runs inside a worker process.
+    """
+    if not content[:1024].lstrip().startswith(b"%PDF-"):
+        return content.decode("utf-8", errors="ignore").lower()
+
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        encrypted = reader.is_encrypted
+        pages = None if encrypted else reader.pages
+        page_count = 0 if encrypted else len(pages)
+    except Exception as e:
+        # Damaged PDF: fall back to whatever is readable in the raw bytes
+        print(f"Could not open prescription PDF: {e}")
+        return content.decode("utf-8", errors="ignore").lower()
+    if encrypted:
+        raise PrescriptionError("This PDF is password protected. Please upload an unprotected copy.")
+    if page_count > max_pages:
+        raise PrescriptionError(f"Prescriptions are limited to {max_pages} pages.")
+
+    texts = []
+    for page in pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception as e:
+            print(f"Skipping unreadable prescription page: {e}")
+    return "\n".join(texts).lower()
+
+
+def _worker(conn, content: bytes, max_pages: int):
+    """Child process entry point: send back ("ok", text) or ("error", exception)."""
+    try:
+        result = ("ok", extract_text(content, max_pages))
+    except Exception as e:
+        result = ("error", e if isinstance(e, PrescriptionError) else RuntimeError(f"{type(e).__name__}: {e}"))
+    conn.send(result)
+    conn.close()
+
+
+# forkserver forks each parser from a small clean server process (cheap, and safe next to
+# torch/FAISS threads); spawn where it isn't available
+_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_slots = threading.BoundedSemaphore(WORKERS)
+
+
+def _parse_isolated(content: bytes, max_pages: int, timeout: float) -> str:
+    """
+    Run extract_text in a process of its own, so a parse that times out can be killed
+    without touching anyone else's. At most WORKERS parser processes run at once; `timeout`
+    covers both the wait for a free slot and the parse itself.
+    """
+    deadline = time.monotonic() + timeout
+    if not _slots.acquire(timeout=timeout):
+        print(f"⚠️ No prescription parser free within {timeout:g}s")
+        raise PrescriptionError(TIMEOUT_MESSAGE)
+    try:
+        reader, writer = _context.Pipe(duplex=False)
+        process = _context.Process(target=_worker, args=(writer, content, max_pages), daemon=True)
+        process.start()
+        writer.close()
+        try:
+            if not reader.poll(max(0.0, deadline - time.monotonic())):
+                print(f"⚠️ Prescription parsing timed out after {timeout:g}s; killing its parser process")
+                process.kill()
+                raise PrescriptionError(TIMEOUT_MESSAGE)
+            try:
+                status, value = reader.recv()
+            except EOFError:
+                # The parser died without answering (out of memory, crash in a C extension...)
+                print(f"⚠️ Prescription parser process exited with code {process.exitcode}")
+                raise PrescriptionError("We could not read this file. Please upload a clearer copy.")
+        finally:
+            reader.close()
+            process.join(1)
+    finally:
+        _slots.release()
+    if status == "error":
+        raise value
+    return value
+
+
+async def parse(content: bytes) -> str:
+    """Extract the text of an upload off the event loop, enforcing the size, page and time limits."""
+    if len(content) > MAX_BYTES:
+        raise PrescriptionError(f"The file is too large (max {MAX_BYTES // (1024 * 1024)} MB).")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _parse_isolated, content, MAX_PAGES, TIMEOUT)
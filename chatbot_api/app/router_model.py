@@ -1,7 +1,19 @@
+import json
+import os
 import re
+import time
+
+from .keyword_automaton import KeywordAutomaton
+
+# Robust phrase patterns (Handles "who the hell are you")
+WHO_ARE_YOU_PATTERN = re.compile(r"who\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)")
+HOW_ARE_YOU_PATTERN = re.compile(r"how\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)")
+
+KEYWORD_TABLES = ("pharmacy", "health", "small_talk", "medical_context")
+
 
 class RouterModel:
-    def __init__(self):
+    def __init__(self, keywords_file: str = None):
         # Pharmacy Intents (transactional, inventory)
         self.pharmacy_keywords = [
             "price", "cost", "how much", 
@@ -43,33 +55,115 @@ class RouterModel:
             "safe", "safety", "reaction", "allergic"
         ]
 
+        # Optional JSON file overriding the tables above; re-read when it changes on disk
+        self.keywords_file = keywords_file or os.getenv("ROUTER_KEYWORDS_FILE")
+        self.reload_check_interval = 1.0
+        self._keywords_mtime = None
+        self._last_reload_check = 0.0
+        self._compiled = None
+
+        if self.keywords_file:
+            self.reload_keywords()
+        else:
+            self._compile()
+
+    def _compile(self):
+        """Compile every keyword table into one automaton (and the small-talk phrases, checked first, into another)."""
+        tables = {
+            "pharmacy": self.pharmacy_keywords,
+            "health": self.health_keywords,
+            "medical_context": self.medical_context_keywords,
+            # Single small-talk words are matched against tokens, phrases as substrings
+            "small_talk": [k for k in self.small_talk_keywords if " " in k],
+        }
+        automaton = KeywordAutomaton(k for keywords in tables.values() for k in keywords)
+        ids = {k: kid for kid, k in enumerate(automaton.keywords)}
+
+        # Per table: the keyword ids it contains, plus extra weight for keywords listed twice
+        table_ids, table_extra = {}, {}
+        for table, keywords in tables.items():
+            table_ids[table] = frozenset(ids[k] for k in keywords)
+            table_extra[table] = {ids[k]: keywords.count(k) - 1 for k in set(keywords) if keywords.count(k) > 1}
+        small_talk_words = frozenset(k for k in self.small_talk_keywords if " " not in k)
+        small_talk_phrases = KeywordAutomaton(tables["small_talk"])
+
+        # Swap in a single assignment so concurrent route_query calls see a consistent table set
+        self._compiled = (automaton, table_ids, table_extra, small_talk_words, small_talk_phrases)
+
+    def set_keywords(self, **tables):
+        """Replace one or more keyword tables at runtime, e.g. set_keywords(health=[...])."""
+        for table, keywords in tables.items():
+            if table not in KEYWORD_TABLES:
+                raise ValueError(f"Unknown keyword table: {table}")
+            setattr(self, f"{table}_keywords", list(keywords))
+        self._compile()
+
+    def reload_keywords(self):
+        """(Re)load keyword tables from `keywords_file`."""
+        try:
+            mtime = os.path.getmtime(self.keywords_file)
+            with open(self.keywords_file, 'r', encoding='utf-8') as f:
+                tables = json.load(f)
+            self.set_keywords(**{k: v for k, v in tables.items() if k in KEYWORD_TABLES})
+            self._keywords_mtime = mtime
+            print(f"Router keywords loaded from {self.keywords_file}")
+        except (OSError, ValueError) as e:
+            print(f"Failed to load router keywords from {self.keywords_file}: {e}")
+            if self._compiled is None:
+                self._compile()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_check_interval:
+            return
+        self._last_reload_check = now
+        try:
+            mtime = os.path.getmtime(self.keywords_file)
+        except OSError:
+            return
+        if mtime != self._keywords_mtime:
+            self.reload_keywords()
+
+    def score(self, message: str) -> dict:
+        """Number of keywords from each table present in the (lowercased) message."""
+        automaton, table_ids, table_extra = self._compiled[:3]
+        found = automaton.find_ids(message)
+        scores = {}
+        for table, ids in table_ids.items():
+            hits = found & ids
+            scores[table] = len(hits)
+            extra = table_extra[table]
+            if extra and hits:
+                scores[table] += sum(extra.get(kid, 0) for kid in hits)
+        return scores
+
     def route_query(self, message: str) -> str:
+        if self.keywords_file:
+            self._maybe_reload()
+
         message = message.lower()
         tokens = set(message.split())
+        small_talk_words, small_talk_phrases = self._compiled[3:]
         
         # Check Small Talk first
         # Use token matching for single words to avoid "ho" in "how" match issues
-        for k in self.small_talk_keywords:
-            if " " in k: # Multi-word phrase (e.g. "how are you")
-                if k in message:
-                    return "small_talk"
-            else: # Single word (e.g. "hi")
-                if k in tokens:
-                    return "small_talk"
+        if not small_talk_words.isdisjoint(tokens) or small_talk_phrases.matches(message):
+            return "small_talk"
         
         # Regex Matching for Robust Phrases (Handles "who the hell are you")
         # Matches: "who ... are ... you/u"
-        if re.search(r"who\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", message):
+        if "who" in message and WHO_ARE_YOU_PATTERN.search(message):
              return "small_talk"
              
         # Matches: "how ... (are|r) ... (you|u)"
-        if re.search(r"how\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", message):
+        if "how" in message and HOW_ARE_YOU_PATTERN.search(message):
              return "small_talk"
         
-        # Scoring
-        pharmacy_score = sum(1 for k in self.pharmacy_keywords if k in message)
-        health_score = sum(1 for k in self.health_keywords if k in message)
-        medical_context_score = sum(1 for k in self.medical_context_keywords if k in message)
+        # Scoring: one pass over the message counts the keywords of every table
+        scores = self.score(message)
+        pharmacy_score = scores["pharmacy"]
+        health_score = scores["health"]
+        medical_context_score = scores["medical_context"]
         
         # Logic: Prioritize Health/Medical Advice for narrative queries
         # If the user mentions a doctor, symptoms ("dizzy"), or asks for advice ("should I"),
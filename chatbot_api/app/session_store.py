@@ -0,0 +1,149 @@
+import copy
+import os
+import threading
+import time
+
+from .cache import TTLCache
+
+# Context keys holding Medicine objects; they are stored as ids and resolved on read
+MEDICINE_KEYS = ("last_added",)
+MEDICINE_LIST_KEYS = ("last_search",)
+
+
+class MemorySessionStore:
+    """Process-local store: LRU-bounded, idle sessions expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, session_id: str):
+        data = self._cache.get(session_id)
+        return copy.deepcopy(data) if data is not None else None
+
+    def set(self, session_id: str, data: dict):
+        self._cache.set(session_id, copy.deepcopy(data))
+
+    def delete(self, session_id: str):
+        self._cache.delete(session_id)
+
+
+class DatabaseSessionStore:
+    """
+    Store backed by the chatbot.ChatSession table, shared by every worker and node
+    using the same database. Sessions idle for `ttl` seconds are ignored and purged.
+    """
+
+    def __init__(self, ttl: float = 3600, purge_interval: float = 300):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def _cutoff(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def get(self, session_id: str):
+        from chatbot.models import ChatSession
+        return ChatSession.objects.filter(
+            session_id=session_id, updated_at__gte=self._cutoff()
+        ).values_list('data', flat=True).first()
+
+    def set(self, session_id: str, data: dict):
+        from chatbot.models import ChatSession
+        ChatSession.objects.update_or_create(session_id=session_id, defaults={'data': data})
+        self._maybe_purge()
+
+    def delete(self, session_id: str):
+        from chatbot.models import ChatSession
+        ChatSession.objects.filter(session_id=session_id).delete()
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        from chatbot.models import ChatSession
+        deleted, _ = ChatSession.objects.filter(updated_at__lt=self._cutoff()).delete()
+        if deleted:
+            print(f"Purged {deleted} idle chat sessions.")
+
+
+def get_session_store():
+    """Backend selected by CHATBOT_SESSION_BACKEND: 'memory' (default) or 'db'."""
+    backend = os.getenv("CHATBOT_SESSION_BACKEND", "memory").lower()
+    ttl = float(os.getenv("CHATBOT_SESSION_TTL", "3600"))
+    if backend in ("db", "database"):
+        return DatabaseSessionStore(ttl=ttl)
+    if backend != "memory":
+        raise ValueError(f"Unknown CHATBOT_SESSION_BACKEND '{backend}' (expected 'memory' or 'db')")
+    return MemorySessionStore(maxsize=int(os.getenv("CHATBOT_SESSION_MAX", "10000")), ttl=ttl)
+
+
+class SessionContext:
+    """
+    One session's context. Reads return Medicine objects; every write is saved to the
+    store straight away, so the next message may be handled by another worker.
+    """
+
+    def __init__(self, sessions, session_id: str, data: dict):
+        self._sessions = sessions
+        self.session_id = session_id
+        self._data = data
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        return self._sessions.decode(key, self._data[key])
+
+    def __getitem__(self, key):
+        if key not in self._data:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        self._data[key] = self._sessions.encode(key, value)
+        self._sessions.store.set(self.session_id, self._data)
+
+
+class SessionManager:
+    """
+    Dict-like view of conversation contexts (`session_id in sessions`, `sessions[sid]["key"]`)
+    over a session store. Medicines are kept as ids and resolved through the catalog index.
+    """
+
+    def __init__(self, store, catalog):
+        self.store = store
+        self.catalog = catalog
+
+    def encode(self, key, value):
+        if key in MEDICINE_KEYS:
+            return value.pk if value is not None else None
+        if key in MEDICINE_LIST_KEYS:
+            return [m.pk for m in value]
+        return value
+
+    def decode(self, key, value):
+        if key in MEDICINE_KEYS:
+            return self.catalog.get(value) if value is not None else None
+        if key in MEDICINE_LIST_KEYS:
+            # Medicines deleted since the context was saved simply drop out
+            return [m for m in (self.catalog.get(pk) for pk in value) if m is not None]
+        return value
+
+    def __contains__(self, session_id):
+        return self.store.get(session_id) is not None
+
+    def __getitem__(self, session_id):
+        data = self.store.get(session_id)
+        if data is None:
+            raise KeyError(session_id)
+        return SessionContext(self, session_id, data)
+
+    def __setitem__(self, session_id, context: dict):
+        self.store.set(session_id, {key: self.encode(key, value) for key, value in context.items()})
+
+    def __delitem__(self, session_id):
+        self.store.delete(session_id)
@@ -0,0 +1,101 @@
+import math
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+class IndexConfig:
+    """
+    Which FAISS index HealthBot builds and how it is searched.
+
+    flat  -- exact brute-force L2 scan (the default)
+    ivf   -- inverted lists over k-means cells; `nprobe` cells are scanned per query
+    hnsw  -- graph index; fast and accurate but cannot remove vectors (updates rebuild it)
+    ivfpq -- ivf with product-quantised vectors (`pq_m` bytes each); smallest, least exact
+    """
+
+    def __init__(self, index_type: str = "flat", nlist: int = 0, nprobe: int = 8,
+                 hnsw_m: int = 32, ef_construction: int = 80, ef_search: int = 64,
+                 pq_m: int = 48, min_vectors: int = 1000):
+        index_type = (index_type or "flat").lower()
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+        self.index_type = index_type
+        self.nlist = nlist  # 0 = derived from the corpus size
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.min_vectors = min_vectors
+
+    @classmethod
+    def from_env(cls, environ):
+        return cls(
+            index_type=environ.get("HEALTHBOT_INDEX_TYPE", "flat"),
+            nlist=int(environ.get("HEALTHBOT_IVF_NLIST", "0")),
+            nprobe=int(environ.get("HEALTHBOT_IVF_NPROBE", "8")),
+            hnsw_m=int(environ.get("HEALTHBOT_HNSW_M", "32")),
+            ef_search=int(environ.get("HEALTHBOT_HNSW_EF_SEARCH", "64")),
+            pq_m=int(environ.get("HEALTHBOT_PQ_M", "48")),
+            min_vectors=int(environ.get("HEALTHBOT_ANN_MIN_VECTORS", "1000")),
+        )
+
+    def resolve(self, n: int, dimension: int) -> str:
+        """Index type actually built for `n` vectors; small corpora always get an exact flat index."""
+        if self.index_type == "flat" or n < self.min_vectors:
+            return "flat"
+        if self.index_type == "ivfpq" and (dimension % self.pq_m or n < 256 * 39):
+            # PQ needs pq_m to divide the dimension and ~39 training points per code (256 codes)
+            return "ivf"
+        return self.index_type
+
+    def cells(self, n: int) -> int:
+        # ~4*sqrt(n) cells, but at least 39 training points per cell
+        nlist = self.nlist or int(4 * math.sqrt(n))
+        return max(1, min(nlist, n // 39))
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, config: IndexConfig):
+    """Build (and train, if needed) the configured index over `vectors`, keyed by `ids`."""
+    n, dimension = vectors.shape
+    index_type = config.resolve(n, dimension)
+    if index_type == "ivf":
+        description = f"IVF{config.cells(n)},Flat"
+    elif index_type == "ivfpq":
+        description = f"IVF{config.cells(n)},PQ{config.pq_m}"
+    elif index_type == "hnsw":
+        description = f"IDMap,HNSW{config.hnsw_m}"
+    else:
+        description = "IDMap,Flat"
+
+    index = faiss.index_factory(dimension, description, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = config.ef_construction
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids)
+    configure_search(index, config)
+    return index
+
+
+def _base_index(index):
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def supports_remove(index) -> bool:
+    """HNSW graphs can't drop vectors; everything else supports remove_ids."""
+    return not isinstance(_base_index(index), faiss.IndexHNSW)
+
+
+def configure_search(index, config: IndexConfig):
+    """Apply the query-time knobs (nprobe / efSearch); they are not all kept in the index file."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.nprobe, ivf.nlist)
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = config.ef_search
+    return index
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class BackgroundLoader:
+    """
+    Builds one slow component (e.g. HealthBot: model load, index rebuild) in a daemon
+    thread, so the service can accept requests while it warms up. Requests ask for it
+    with a bounded `wait`, and the readiness probe reports its `status`.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self._future = Future()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start loading (idempotent)."""
+        with self._lock:
+            if self.state != PENDING:
+                return
+            self.state = LOADING
+        threading.Thread(target=self._load, name=f"warmup-{self.name}", daemon=True).start()
+
+    def _load(self):
+        self.started_at = time.time()
+        start = time.perf_counter()
+        self._future.set_running_or_notify_cancel()
+        print(f"🔄 Warming up {self.name}...")
+        try:
+            value = self.factory()
+        except Exception as e:
+            self.load_seconds = time.perf_counter() - start
+            self.error = str(e)
+            self.state = FAILED
+            print(f"Failed to load {self.name}: {e}")
+            self._future.set_exception(e)
+            return
+        self.load_seconds = time.perf_counter() - start
+        self.state = READY
+        print(f"✅ {self.name} ready in {self.load_seconds:.1f}s")
+        self._future.set_result(value)
+
+    def get(self):
+        """The component if it is loaded, else None (never blocks)."""
+        if self._future.done() and self._future.exception() is None:
+            return self._future.result()
+        return None
+
+    async def wait(self, timeout: float):
+        """The component, waiting up to `timeout` seconds for it; None if not ready by then or failed."""
+        if self.state == PENDING:
+            self.start()
+        if not self._future.done() and timeout > 0:
+            try:
+                # shield: a timed-out request must not cancel the load itself
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self._future)), timeout)
+            except Exception:
+                pass
+        return self.get()
+
+    def status(self) -> dict:
+        status = {"state": self.state}
+        if self.load_seconds is not None:
+            status["load_seconds"] = round(self.load_seconds, 3)
+        elif self.started_at is not None:
+            status["loading_seconds"] = round(time.time() - self.started_at, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
@@ -0,0 +1,178 @@
+"""
+Parity and cost of HealthBot's encoder backends: PyTorch fp32, ONNX fp32 and ONNX int8.
+
+Every backend runs in its own process (so RSS is that of a worker using only that backend)
+and encodes the corpus passages HealthBot indexes plus a set of sample questions.
+Reported per backend: load time, single-query latency, batch throughput and peak RSS.
+Parity against PyTorch: cosine similarity per passage, and whether ONNX query vectors
+searched against the PyTorch-built index find the same passages.
+
+Exits non-zero if the int8 encoder's mean passage cosine is below --min-cosine.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from chatbot_api.app.onnx_encoder import DEFAULT_MODEL_DIR
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "corpus" / "cleaned" / "health_data.json"
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+
+SAMPLE_QUERIES = [
+    "what are the side effects of ibuprofen", "can i take paracetamol while pregnant",
+    "medicine for high blood pressure", "how much amoxicillin for a child", "sleep aid",
+    "what helps with nausea and vomiting", "antibiotic for a urinary infection",
+    "cholesterol lowering drug", "is it safe to drink alcohol with metformin",
+    "warnings for blood thinners", "allergy relief that does not make you drowsy",
+    "dosage of omeprazole for heartburn", "symptoms of serotonin syndrome",
+    "muscle pain with statins", "what is levothyroxine used for", "asthma inhaler",
+    "migraine treatment", "anxiety medication", "diabetes tablets", "eye drops for glaucoma",
+]
+
+
+def corpus_passages(corpus_path, chunk_chars):
+    """The passages HealthBot embeds, using its chunking without loading the bot."""
+    from chatbot_api.app.health_bot import HealthBot
+
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        documents = json.load(f)
+    chunker = HealthBot.__new__(HealthBot)
+    chunker.chunk_chars = chunk_chars
+    return [text for doc in documents for text in chunker._doc_chunks(doc)]
+
+
+def load_encoder(backend, model_dir, threads):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+    from chatbot_api.app.onnx_encoder import OnnxEncoder
+    name = "model.int8.onnx" if backend == "onnx-int8" else "model.onnx"
+    return OnnxEncoder(os.path.join(model_dir, name), threads=threads)
+
+
+def run_worker(args):
+    """Child process: measure one backend, save its embeddings, print stats as JSON."""
+    with open(args.passages_file, "r", encoding="utf-8") as f:
+        passages = json.load(f)
+
+    start = time.perf_counter()
+    encoder = load_encoder(args.worker, args.model_dir, args.threads)
+    load_s = time.perf_counter() - start
+
+    # Single queries, the way the micro-batcher sees them under light load
+    for query in SAMPLE_QUERIES[:3]:
+        encoder.encode([query])
+    latencies = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        encoder.encode([SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    passage_vectors = np.asarray(encoder.encode(passages, batch_size=32), dtype="float32")
+    batch_s = time.perf_counter() - start
+    query_vectors = np.asarray(encoder.encode(SAMPLE_QUERIES), dtype="float32")
+    np.savez(args.out, passages=passage_vectors, queries=query_vectors)
+
+    print(json.dumps({
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "passages_per_s": len(passages) / batch_s,
+        # ru_maxrss is in KB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def normalise(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def top_k(queries, passages, k):
+    return np.argsort(-(normalise(queries) @ normalise(passages).T), axis=1)[:, :k]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare HealthBot encoder backends (parity, latency, memory).")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR, help="output of export_onnx.py")
+    parser.add_argument("--corpus", default=str(CORPUS_PATH))
+    parser.add_argument("--chunk-chars", type=int, default=int(os.getenv("HEALTHBOT_CHUNK_CHARS", "800")))
+    parser.add_argument("--limit", type=int, default=0, help="only encode the first N passages (0 = all)")
+    parser.add_argument("--queries", type=int, default=200, help="single-query encodes for the latency figures")
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = one per core)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--passages-file", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        sys.exit(0)
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if backends[0] != "torch":
+        backends.insert(0, "torch")  # the reference for parity
+    passages = corpus_passages(args.corpus, args.chunk_chars)
+    if args.limit:
+        passages = passages[:args.limit]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        passages_file = os.path.join(tmp, "passages.json")
+        with open(passages_file, "w", encoding="utf-8") as f:
+            json.dump(passages, f)
+
+        stats, vectors = {}, {}
+        for backend in backends:
+            out = os.path.join(tmp, f"{backend}.npz")
+            result = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, "--passages-file", passages_file, "--out", out,
+                 "--model-dir", args.model_dir, "--queries", str(args.queries), "--threads", str(args.threads)],
+                capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{backend}: failed\n{result.stderr.strip()}")
+                continue
+            stats[backend] = json.loads(result.stdout.strip().splitlines()[-1])
+            with np.load(out) as data:
+                vectors[backend] = (data["passages"], data["queries"])
+
+    if "torch" not in vectors:
+        sys.exit("The PyTorch reference could not be run.")
+
+    print(f"\n{len(passages)} passages, {len(SAMPLE_QUERIES)} sample queries, k={args.k}")
+    print(f"{'BACKEND':<9} | {'LOAD s':>6} | {'P50 ms':>7} | {'P99 ms':>7} | {'PASSAGES/s':>10} | {'RSS MB':>7}")
+    for backend, s in stats.items():
+        print(f"{backend:<9} | {s['load_s']:6.1f} | {s['p50_ms']:7.2f} | {s['p99_ms']:7.2f} | "
+              f"{s['passages_per_s']:10.1f} | {s['rss_mb']:7.0f}")
+
+    ref_passages, ref_queries = vectors["torch"]
+    ref_top = top_k(ref_queries, ref_passages, args.k)
+    print(f"\n{'BACKEND':<9} | {'MEAN COS':>8} | {'MIN COS':>8} | {'P1 COS':>8} | {'TOP-1 SAME':>10} | {'OVERLAP@k':>9}")
+    failed = False
+    for backend, (passage_vectors, query_vectors) in vectors.items():
+        if backend == "torch":
+            continue
+        cosine = np.sum(normalise(passage_vectors) * normalise(ref_passages), axis=1)
+        # The deployed mix: an index built by one backend searched with the other's query vectors
+        found = top_k(query_vectors, ref_passages, args.k)
+        same_top1 = np.mean(found[:, 0] == ref_top[:, 0])
+        overlap = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, ref_top)])
+        print(f"{backend:<9} | {cosine.mean():8.4f} | {cosine.min():8.4f} | {np.percentile(cosine, 1):8.4f} | "
+              f"{same_top1:10.2f} | {overlap:9.3f}")
+        if backend == "onnx-int8" and cosine.mean() < args.min_cosine:
+            failed = True
+
+    if failed:
+        sys.exit(f"onnx-int8 parity below {args.min_cosine} mean cosine")
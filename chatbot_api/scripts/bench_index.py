@@ -0,0 +1,81 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from chatbot_api.app.vector_index import INDEX_TYPES, IndexConfig, build_index
+
+
+def synthetic_corpus(n, dimension, clusters=256, seed=42):
+    """Unit-length vectors grouped around random topics, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    vectors = centers[rng.integers(0, clusters, n)] + 0.4 * rng.standard_normal((n, dimension)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def sample_queries(vectors, count, seed=7):
+    """Noisy copies of corpus vectors, so every query has real near neighbours."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), count)] + 0.15 * rng.standard_normal(
+        (count, vectors.shape[1])).astype('float32')
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+
+def bench(index, queries, k):
+    """Single-query latencies (ms), the way HealthBot searches, plus the ids found."""
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, I = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(I[0])
+    return np.array(latencies), np.array(found)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare HealthBot FAISS index types on a synthetic corpus.")
+    parser.add_argument("--sizes", default="10000", help="comma-separated corpus sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="index types to compare")
+    parser.add_argument("--dim", type=int, default=384, help="vector dimension (all-MiniLM-L6-v2: 384)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    types = [t.strip() for t in args.types.split(",") if t.strip()]
+    for n in [int(s) for s in args.sizes.split(",")]:
+        vectors = synthetic_corpus(n, args.dim)
+        ids = np.arange(n, dtype='int64')
+        queries = sample_queries(vectors, args.queries)
+
+        # Ground truth from an exact scan
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+
+        print(f"\nN={n:,} dim={args.dim} queries={args.queries} k={args.k}")
+        print(f"{'TYPE':<7} | {'BUILT AS':<8} | {'BUILD s':>8} | {'RECALL@k':>8} | {'P50 ms':>7} | {'P99 ms':>7} | {'MEMORY MB':>9}")
+        for index_type in types:
+            config = IndexConfig(index_type, nprobe=args.nprobe, ef_search=args.ef_search, min_vectors=0)
+            start = time.perf_counter()
+            index = build_index(vectors, ids, config)
+            build_s = time.perf_counter() - start
+            latencies, found = bench(index, queries, args.k)
+            memory_mb = faiss.serialize_index(index).nbytes / 1e6
+            print(f"{index_type:<7} | {config.resolve(n, args.dim):<8} | {build_s:8.2f} | "
+                  f"{recall_at_k(found, truth):8.3f} | {np.percentile(latencies, 50):7.3f} | "
+                  f"{np.percentile(latencies, 99):7.3f} | {memory_mb:9.1f}")
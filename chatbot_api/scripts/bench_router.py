@@ -0,0 +1,107 @@
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from chatbot_api.app.router_model import RouterModel
+
+
+def legacy_route_query(router, message):
+    """The original keyword-loop implementation, kept here as the reference."""
+    message = message.lower()
+    tokens = set(message.split())
+    for k in router.small_talk_keywords:
+        if " " in k:
+            if k in message:
+                return "small_talk"
+        else:
+            if k in tokens:
+                return "small_talk"
+    if re.search(r"who\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", message):
+        return "small_talk"
+    if re.search(r"how\s+(?:.*\s+)?(are|r)\s+(?:.*\s+)?(you|u)", message):
+        return "small_talk"
+    pharmacy_score = sum(1 for k in router.pharmacy_keywords if k in message)
+    health_score = sum(1 for k in router.health_keywords if k in message)
+    medical_context_score = sum(1 for k in router.medical_context_keywords if k in message)
+    if medical_context_score > 0:
+        return "health"
+    if health_score > pharmacy_score:
+        return "health"
+    if pharmacy_score > 0:
+        return "pharmacy"
+    if "?" in message and len(message.split()) > 3:
+        return "health"
+    return "pharmacy"
+
+
+QUERIES = [
+    "Can I take Aspirin if I am pregnant?",
+    "symptoms of flu",
+    "We have this in store",
+    "Aspirin",
+    "I'll take 2",
+    "Can I take this with food?",
+    "Is it safe for pregnancy?",
+    "who the hell are you",
+    "how r u doing today",
+    "Do you have Panadol in stock and how much does it cost?",
+    "what are the side effects of ibuprofen",
+    "add 3 boxes of amoxicillin to my cart",
+    "when do you open on sunday",
+    "My 5 year old son has a high fever and a rash. Is it safe to give him Ibuprofen?",
+    "I am running out of my allergy meds. Do you have any Zyrtec in stock?",
+    "what is the dosage of metformin for adults",
+    "checkout please",
+    "is there any information about warnings for warfarin",
+    "thanks a lot",
+    "whats up",
+]
+
+
+def random_queries(count, seed=42, small_talk=True):
+    """Random keyword soup; without small talk both implementations have to score every table."""
+    rng = random.Random(seed)
+    router = RouterModel()
+    vocabulary = (router.pharmacy_keywords + router.health_keywords + router.medical_context_keywords
+                  + ["panadol", "ibuprofen", "tablet", "the", "my", "is", "?", "who", "are", "you"])
+    if small_talk:
+        vocabulary += router.small_talk_keywords
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 25))) for _ in range(count)]
+
+
+def bench(fn, queries, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for q in queries:
+            fn(q)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries) * 1e6
+
+
+if __name__ == "__main__":
+    router = RouterModel()
+    workloads = {
+        "sample chat messages": QUERIES * 50,
+        "random keyword soup": random_queries(5000),
+        "random, no small talk": random_queries(5000, seed=7, small_talk=False),
+    }
+
+    mismatches = []
+    for queries in workloads.values():
+        mismatches += [q for q in queries if router.route_query(q) != legacy_route_query(router, q)]
+    print(f"Routing decisions checked: {sum(len(q) for q in workloads.values())}, mismatches: {len(mismatches)}")
+    for q in mismatches[:10]:
+        print(f"  MISMATCH: {q!r}")
+
+    print(f"{'WORKLOAD':<24} | {'LEGACY us/q':>11} | {'AUTOMATON us/q':>14} | SPEEDUP")
+    for name, queries in workloads.items():
+        legacy_us = bench(lambda q: legacy_route_query(router, q), queries)
+        new_us = bench(router.route_query, queries)
+        print(f"{name:<24} | {legacy_us:11.2f} | {new_us:14.2f} | {legacy_us / new_us:6.2f}x")
+
+    sys.exit(1 if mismatches else 0)
@@ -1,7 +1,32 @@
-import requests
+"""
+Builds the HealthBot corpus (corpus/cleaned/health_data.json) from Wikipedia summaries and
+OpenFDA drug labels.
+
+Topics are fetched concurrently by a thread pool sharing one pooled HTTP session, under a
+global request rate limit. Raw responses are cached on disk keyed by URL, and every finished
+topic is appended to a JSONL checkpoint as soon as it is done, so an interrupted run resumes
+where it stopped (re-running after a failure only fetches the missing topics) and a rebuild
+with a warm cache makes no requests at all. The JSON corpus is written from the JSONL at the end,
+and only once every topic succeeded.
+
+    python chatbot_api/scripts/build_corpus.py --workers 16 --rate 20
+    python chatbot_api/scripts/build_corpus.py --topics-file topics.txt --fresh
+
+The API base URLs can point at a local stub server (--wiki-url / --fda-url or
+CORPUS_WIKI_URL / CORPUS_FDA_URL).
+"""
+import argparse
+import hashlib
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # List of medical topics to build our "Real" Corpus
 # List of medical topics to build our "Real" Corpus
@@ -36,92 +61,246 @@ TOPICS = [
 
 CORPUS_DIR = os.path.join(os.path.dirname(__file__), '../corpus/cleaned')
 OUTPUT_FILE = os.path.join(CORPUS_DIR, 'health_data.json')
+CHECKPOINT_FILE = os.path.join(CORPUS_DIR, 'health_data.jsonl')
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '../corpus/http_cache')
 
-def fetch_wikipedia_summary(title):
-    try:
-        url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "id": f"wiki_{data.get('pageid')}",
-                "source": "Wikipedia",
-                "title": data.get('title'),
-                "text": data.get('extract'),
-                "url": data.get('content_urls', {}).get('desktop', {}).get('page', '')
-            }
-    except Exception as e:
-        print(f"Error fetching Wikipedia for {title}: {e}")
-    return None
+WIKI_URL = os.getenv("CORPUS_WIKI_URL", "https://en.wikipedia.org/api/rest_v1")
+FDA_URL = os.getenv("CORPUS_FDA_URL", "https://api.fda.gov")
+
+# Responses worth caching: found, or definitely not there
+CACHEABLE_STATUSES = {200, 404}
+
+
+class RateLimiter:
+    """Token bucket shared by all worker threads: at most `rate` requests per second on average."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CachedFetcher:
+    """GET through a pooled session with retries, the rate limiter and an on-disk response cache."""
+
+    def __init__(self, cache_dir: str, rate: float, pool_size: int, retries: int = 3, timeout: float = 10):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate, burst=pool_size)
+        self.requests_made = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Retries with backoff on throttling and server errors, honouring Retry-After
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "MedPlus-corpus-builder/1.0"
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _cache_path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def get(self, url: str):
+        """(status code, body text) for `url`, from the cache when possible."""
+        path = self._cache_path(url)
+        try:
+            with open(path, encoding="utf-8") as f:
+                cached = json.load(f)
+            with self._lock:
+                self.cache_hits += 1
+            return cached["status"], cached["body"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        self.limiter.acquire()
+        response = self.session.get(url, timeout=self.timeout)
+        with self._lock:
+            self.requests_made += 1
+        if response.status_code == 429 or response.status_code >= 500:
+            # Still failing after the retries: fail the topic rather than record it as empty
+            response.raise_for_status()
+        if response.status_code in CACHEABLE_STATUSES:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "status": response.status_code, "body": response.text}, f)
+            os.replace(tmp_path, path)
+        return response.status_code, response.text
+
+
+def fetch_wikipedia_summary(fetcher, title, base_url=WIKI_URL):
+    status, body = fetcher.get(f"{base_url}/page/summary/{quote(title)}")
+    if status != 200:
+        return None
+    data = json.loads(body)
+    return {
+        "id": f"wiki_{data.get('pageid')}",
+        "source": "Wikipedia",
+        "title": data.get('title'),
+        "text": data.get('extract'),
+        "url": data.get('content_urls', {}).get('desktop', {}).get('page', '')
+    }
 
-def fetch_openfda_label(drug_name):
+def fetch_openfda_label(fetcher, drug_name, base_url=FDA_URL):
     """
     Fetches drug label information from OpenFDA (Source of DailyMed data).
     """
-    try:
-        # Search for the drug by generic name
-        url = f"https://api.fda.gov/drug/label.json?search=openfda.generic_name:\"{drug_name}\"&limit=1"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if 'results' in data and len(data['results']) > 0:
-                result = data['results'][0]
-                
-                # Extract useful sections
-                indications = result.get('indications_and_usage', [''])[0]
-                warnings = result.get('warnings', [''])[0]
-                dosage = result.get('dosage_and_administration', [''])[0]
-                
-                # Combine into a useful text block
-                full_text = f"**Drug Info for {drug_name}**\n\n**Indications:** {indications}\n\n**Warnings:** {warnings}\n\n**Dosage:** {dosage}"
-                
-                # Removed truncation to ensure completeness as requested by user
-                # if len(full_text) > 2000:
-                #    full_text = full_text[:2000] + "..."
-                    
-                return {
-                    "id": f"openfda_{drug_name}",
-                    "source": "OpenFDA (DailyMed)",
-                    "title": f"{drug_name} Label Information",
-                    "text": full_text,
-                    "url": "https://open.fda.gov/"
-                }
-    except Exception as e:
-        print(f"Error fetching OpenFDA for {drug_name}: {e}")
+    # Search for the drug by generic name
+    status, body = fetcher.get(f"{base_url}/drug/label.json?search=openfda.generic_name:\"{drug_name}\"&limit=1")
+    if status != 200:
+        return None
+    data = json.loads(body)
+    if 'results' in data and len(data['results']) > 0:
+        result = data['results'][0]
+
+        # Extract useful sections
+        indications = result.get('indications_and_usage', [''])[0]
+        warnings = result.get('warnings', [''])[0]
+        dosage = result.get('dosage_and_administration', [''])[0]
+
+        # Combine into a useful text block
+        full_text = f"**Drug Info for {drug_name}**\n\n**Indications:** {indications}\n\n**Warnings:** {warnings}\n\n**Dosage:** {dosage}"
+
+        return {
+            "id": f"openfda_{drug_name}",
+            "source": "OpenFDA (DailyMed)",
+            "title": f"{drug_name} Label Information",
+            "text": full_text,
+            "url": "https://open.fda.gov/"
+        }
     return None
 
-def build_corpus():
-    if not os.path.exists(CORPUS_DIR):
-        os.makedirs(CORPUS_DIR)
-        
+def fetch_topic(fetcher, topic, wiki_url=WIKI_URL, fda_url=FDA_URL) -> list:
     documents = []
-    print(f"Fetching data for {len(TOPICS)} medical topics...")
-    
-    for topic in TOPICS:
-        print(f" Processing Topic: {topic}")
-        
-        # 1. Try Wikipedia for ALL topics (General Knowledge)
-        wiki_doc = fetch_wikipedia_summary(topic)
-        if wiki_doc:
-            documents.append(wiki_doc)
-            
-        # 2. Try OpenFDA for Medications (Deep Clinical Data)
-        # Simple heuristic: if it's in our medication list part of TOPICS
-        # (We'll just try for all, worst case it returns nothing)
-        fda_doc = fetch_openfda_label(topic)
-        if fda_doc:
-            print(f"  + Found FDA Label data for {topic}")
-            documents.append(fda_doc)
-            
-        time.sleep(0.3) # Be nice to APIs
-        
-    print(f"Successfully collected {len(documents)} documents from multiple sources.")
-    
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+
+    # 1. Try Wikipedia for ALL topics (General Knowledge)
+    wiki_doc = fetch_wikipedia_summary(fetcher, topic, wiki_url)
+    if wiki_doc:
+        documents.append(wiki_doc)
+
+    # 2. Try OpenFDA for Medications (Deep Clinical Data)
+    # (We'll just try for all, worst case it returns nothing)
+    fda_doc = fetch_openfda_label(fetcher, topic, fda_url)
+    if fda_doc:
+        documents.append(fda_doc)
+    return documents
+
+
+def load_checkpoint(path: str) -> dict:
+    """{topic: documents} for the topics finished by earlier runs."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done[record["topic"]] = record["documents"]
+            except (ValueError, KeyError):
+                # Last line cut short by an interrupted run: that topic is fetched again
+                continue
+    return done
+
+
+def write_corpus(topics, done: dict, output_file: str) -> int:
+    """Write the JSON corpus in topic order (atomically, the HealthBot may be reading it)."""
+    documents = [doc for topic in topics for doc in done.get(topic, [])]
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(documents, f, indent=4)
-        
-    print(f"Enhanced Corpus saved to {OUTPUT_FILE}")
+    os.replace(tmp_path, output_file)
+    return len(documents)
+
+
+def build_corpus(topics=TOPICS, output_file=OUTPUT_FILE, checkpoint_file=CHECKPOINT_FILE, cache_dir=CACHE_DIR,
+                 workers=8, rate=5.0, fresh=False, wiki_url=WIKI_URL, fda_url=FDA_URL):
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    topics = list(dict.fromkeys(topics))
+
+    if fresh and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    done = load_checkpoint(checkpoint_file)
+    pending = [topic for topic in topics if topic not in done]
+    print(f"Fetching data for {len(topics)} medical topics "
+          f"({len(topics) - len(pending)} already done, {workers} workers, {rate:g} req/s)...")
+
+    fetcher = CachedFetcher(cache_dir, rate=rate, pool_size=workers)
+    failed = []
+    started = time.monotonic()
+
+    with open(checkpoint_file, "a", encoding="utf-8") as checkpoint, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_topic, fetcher, topic, wiki_url, fda_url): topic for topic in pending}
+        for count, future in enumerate(as_completed(futures), 1):
+            topic = futures[future]
+            try:
+                documents = future.result()
+            except Exception as e:
+                # Not checkpointed: the next run tries this topic again
+                print(f"Error fetching {topic}: {e}")
+                failed.append(topic)
+                continue
+            done[topic] = documents
+            checkpoint.write(json.dumps({"topic": topic, "documents": documents}) + "\n")
+            checkpoint.flush()
+            if count % 50 == 0 or count == len(pending):
+                print(f" {count}/{len(pending)} topics ({time.monotonic() - started:.1f}s)")
+
+    print(f"Made {fetcher.requests_made} requests ({fetcher.cache_hits} served from the cache).")
+    if failed:
+        # Writing now would drop those topics' documents (and HealthBot would delete their
+        # vectors): keep the previous corpus until a run completes every topic
+        print(f"{len(failed)} topics failed and will be retried on the next run: {', '.join(sorted(failed))}")
+        print(f"Corpus not rewritten; {output_file} is unchanged.")
+        return failed
+
+    total = write_corpus(topics, done, output_file)
+    print(f"Successfully collected {total} documents from multiple sources.")
+    print(f"Enhanced Corpus saved to {output_file}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics-file", help="One topic per line (default: the built-in TOPICS list)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second across all workers (0 = unlimited)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint (cached responses are still used)")
+    parser.add_argument("--wiki-url", default=WIKI_URL)
+    parser.add_argument("--fda-url", default=FDA_URL)
+    args = parser.parse_args()
+
+    topics = TOPICS
+    if args.topics_file:
+        with open(args.topics_file, encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+
+    failed = build_corpus(topics, args.output, args.checkpoint, args.cache_dir, args.workers, args.rate,
+                          args.fresh, args.wiki_url.rstrip("/"), args.fda_url.rstrip("/"))
+    raise SystemExit(1 if failed else 0)
 
 if __name__ == "__main__":
-    build_corpus()
+    main()
@@ -0,0 +1,65 @@
+"""
+Suggest HEALTHBOT_MAX_DISTANCE for the current encoder and index.
+
+Encodes a set of health questions and a set of off-topic ones, and reports the squared L2
+distance to the closest indexed passage for each group (cosine similarity is 1 - d/2). A good
+threshold sits between the on-topic distances (should be below it) and the off-topic ones
+(should be above it). Rerun it after changing the encoder, HEALTHBOT_ENCODER or the chunking.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from chatbot_api.app.health_bot import HealthBot
+
+ON_TOPIC = [
+    "what are the side effects of ibuprofen", "can i take paracetamol while pregnant",
+    "medicine for high blood pressure", "how much amoxicillin for a child", "sleep aid",
+    "what helps with nausea and vomiting", "antibiotic for a urinary infection",
+    "cholesterol lowering drug", "is it safe to drink alcohol with metformin",
+    "warnings for blood thinners", "allergy relief that does not make you drowsy",
+    "dosage of omeprazole for heartburn", "symptoms of flu", "muscle pain with statins",
+    "what is levothyroxine used for", "asthma inhaler", "migraine treatment",
+    "anxiety medication", "diabetes tablets", "eye drops for glaucoma",
+]
+OFF_TOPIC = [
+    "capital of france", "what is the weather today", "who won the football match",
+    "tell me a joke", "how do i bake bread", "best laptop for programming",
+    "translate hello into spanish", "what time does the train leave", "recommend a movie",
+    "how tall is mount everest", "write a poem about the sea", "stock market news",
+    "how to fix a flat tyre", "what is the meaning of life", "learn to play guitar",
+]
+
+
+def best_distances(bot, queries, k):
+    vectors = np.array(bot.model.encode(queries)).astype('float32')
+    D, I = bot.index.search(vectors, k)
+    return np.where(I[:, 0] >= 0, D[:, 0], np.inf)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suggest HEALTHBOT_MAX_DISTANCE from on/off-topic queries.")
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    bot = HealthBot()
+    on = best_distances(bot, ON_TOPIC, args.k)
+    off = best_distances(bot, OFF_TOPIC, args.k)
+
+    for label, queries, distances in (("ON-TOPIC", ON_TOPIC, on), ("OFF-TOPIC", OFF_TOPIC, off)):
+        print(f"\n{label}: min {distances.min():.3f}  median {np.median(distances):.3f}  max {distances.max():.3f}")
+        for query, distance in sorted(zip(queries, distances), key=lambda x: x[1]):
+            print(f"  {distance:6.3f}  {query}")
+
+    print(f"\nCurrent HEALTHBOT_MAX_DISTANCE: {bot.max_distance}")
+    if on.max() < off.min():
+        print(f"Suggested HEALTHBOT_MAX_DISTANCE: {(on.max() + off.min()) / 2:.2f} "
+              f"(separates all on-topic <= {on.max():.3f} from off-topic >= {off.min():.3f})")
+    else:
+        wrong = int(np.sum(on > off.min())) + int(np.sum(off < on.max()))
+        print(f"The groups overlap ({wrong} queries on the wrong side of some threshold); "
+              f"pick from the distances above. Midpoint of medians: {(np.median(on) + np.median(off)) / 2:.2f}")
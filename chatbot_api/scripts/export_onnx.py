@@ -0,0 +1,94 @@
+"""
+Export HealthBot's sentence encoder to ONNX and quantise it to int8 for HEALTHBOT_ENCODER=onnx.
+
+Writes to the output directory (default chatbot_api/models/all-MiniLM-L6-v2-onnx):
+  model.onnx       fp32 transformer (token embeddings out; pooling happens in OnnxEncoder)
+  model.int8.onnx  the same with dynamically quantised int8 weights (what HealthBot loads)
+  tokenizer.json   fast tokenizer
+  encoder.json     model name, max sequence length, embedding dimension
+
+Needs the full stack: sentence-transformers (torch, transformers), onnx and onnxruntime.
+Check the result with chatbot_api/scripts/bench_encoder.py before deploying it.
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from chatbot_api.app.onnx_encoder import DEFAULT_MODEL_DIR
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def export(model_name: str, output_dir: str, opset: int = 17):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    class TokenEmbeddings(torch.nn.Module):
+        """The bare transformer, returning last_hidden_state only."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+
+    print(f"Loading {model_name}...")
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = TokenEmbeddings(st_model[0].auto_model).eval()
+    tokenizer = st_model.tokenizer
+
+    # 1. fp32 graph with dynamic batch and sequence axes
+    sample = tokenizer(["Ibuprofen relieves pain and fever.", "Dose"], padding=True, return_tensors="pt")
+    inputs = tuple(sample[name] for name in INPUT_NAMES)
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in INPUT_NAMES + ["last_hidden_state"]}
+    # Newer torch defaults to the dynamo exporter; the TorchScript one handles dynamic_axes
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    print(f"Exporting {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(transformer, inputs, fp32_path, input_names=INPUT_NAMES,
+                          output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+                          opset_version=opset, do_constant_folding=True, **options)
+
+    # 2. Dynamic quantisation: int8 weights, activations quantised per batch at run time
+    print(f"Quantising to {int8_path}...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    # onnx can write IR versions newer than onnxruntime loads; fail here rather than in HealthBot
+    import onnxruntime as ort
+    for path in (fp32_path, int8_path):
+        ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    # 3. Tokenizer and the settings OnnxEncoder needs to reproduce the pipeline
+    tokenizer.save_pretrained(output_dir)
+    config = {
+        "model": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "pad_token": tokenizer.pad_token,
+    }
+    with open(os.path.join(output_dir, "encoder.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    for path in (fp32_path, int8_path):
+        print(f"{os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the HealthBot encoder to ONNX (fp32 + int8).")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=DEFAULT_MODEL_DIR, help="output directory")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.model, args.output, args.opset)
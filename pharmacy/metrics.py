@@ -0,0 +1,237 @@
+"""
+Lightweight request instrumentation shared by the Django site and the FastAPI chat service.
+
+Per route: request count, latency, SQL query count and DB time. Per bot stage (routing,
+matching, embedding, FAISS, formatting): latency. Everything is kept in process memory and
+rendered in the Prometheus text format by the local-only /metrics endpoints.
+
+Django is only imported inside the functions that need it, so the bots can time their
+stages without a configured Django project.
+"""
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "500"))
+SLOW_LOG_SAMPLE_RATE = float(os.getenv("METRICS_SLOW_LOG_SAMPLE_RATE", "0.25"))
+ALLOWED_IPS = {ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()}
+
+
+class RequestStats:
+    """Numbers collected while one request is being handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.stages = {}  # {"component.stage": seconds}
+
+    def add_stage(self, key: str, seconds: float):
+        self.stages[key] = self.stages.get(key, 0.0) + seconds
+
+
+_current_request = contextvars.ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # {labels: [bucket counts..., sum, count]}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = _format_labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+
+    def inc(self, labels: tuple, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_format_labels(label_names, labels)}}} {value:g}")
+        return lines
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class MetricsRegistry:
+    REQUEST_LABELS = ("app", "method", "route")
+    STAGE_LABELS = ("component", "stage")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter("medplus_requests_total", "Requests handled, by status code.")
+        self.latency = Histogram("medplus_request_duration_seconds", "Total request latency.", LATENCY_BUCKETS)
+        self.queries = Histogram("medplus_request_db_queries", "SQL queries per request.", QUERY_BUCKETS)
+        self.db_time = Histogram("medplus_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS)
+        self.stages = Histogram("medplus_stage_duration_seconds", "Bot pipeline stage latency.", LATENCY_BUCKETS)
+
+    def observe_request(self, app: str, method: str, route: str, status: int, stats: RequestStats, duration: float):
+        labels = (app, method, route)
+        with self._lock:
+            self.requests.inc(labels + (str(status),))
+            self.latency.observe(labels, duration)
+            self.queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.db_time)
+
+    def observe_stage(self, component: str, stage: str, seconds: float):
+        with self._lock:
+            self.stages.observe((component, stage), seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = self.requests.render(self.REQUEST_LABELS + ("status",))
+            for histogram in (self.latency, self.queries, self.db_time):
+                lines += histogram.render(self.REQUEST_LABELS)
+            lines += self.stages.render(self.STAGE_LABELS)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ---------- REQUEST LIFECYCLE ----------
+def start_request() -> tuple:
+    stats = RequestStats()
+    return stats, _current_request.set(stats)
+
+
+def finish_request(app: str, method: str, route: str, status: int, stats: RequestStats, token=None):
+    duration = time.perf_counter() - stats.started
+    if token is not None:
+        _current_request.reset(token)
+    registry.observe_request(app, method, route, status, stats, duration)
+    if duration * 1000 >= SLOW_REQUEST_MS and random.random() < SLOW_LOG_SAMPLE_RATE:
+        stages = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in sorted(stats.stages.items()))
+        print(f"[slow request] {app} {method} {route} -> {status} in {duration * 1000:.1f}ms "
+              f"({stats.queries} queries, {stats.db_time * 1000:.1f}ms in DB){' ' + stages if stages else ''}")
+
+
+@contextmanager
+def stage(component: str, name: str):
+    """Time one bot stage, e.g. `with stage("healthbot", "faiss"): ...`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe_stage(component, name, elapsed)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.add_stage(f"{component}.{name}", elapsed)
+
+
+def add_to_request(component: str, name: str, seconds: float):
+    """
+    Attribute a stage already timed (and observed) elsewhere, e.g. on a batching thread
+    that runs outside the request's context, to the current request.
+    """
+    stats = _current_request.get()
+    if stats is not None:
+        stats.add_stage(f"{component}.{name}", seconds)
+
+
+def timed(component: str, name: str):
+    """Decorator form of `stage`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(component, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_allowed(remote_addr: str) -> bool:
+    return remote_addr in ALLOWED_IPS
+
+
+# ---------- SQL QUERY COUNTING ----------
+def _count_query(execute, sql, params, many, context):
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def _install_on_connection(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    """Count queries on every DB connection, in whichever thread it is opened."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    connection_created.connect(_install_on_connection, dispatch_uid="medplus_metrics_query_counter")
+    for connection in connections.all(initialized_only=True):
+        _install_on_connection(None, connection)
+
+
+# ---------- DJANGO ----------
+class MetricsMiddleware:
+    """Django middleware recording per-route latency and query counts."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_counter()
+
+    def __call__(self, request):
+        stats, token = start_request()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = getattr(request, "resolver_match", None)
+            route = "/" + match.route if match is not None else "<unmatched>"
+            finish_request("django", request.method, route, status, stats, token)
+
+
+def metrics_view(request):
+    from django.http import HttpResponse, Http404
+    if not is_allowed(request.META.get("REMOTE_ADDR", "")):
+        raise Http404()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # -------------------------------
 MIDDLEWARE = [
+    "pharmacy.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -188,12 +189,47 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 
 # Chatbot Backend
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://127.0.0.1:8001")
+# Keep-alive pool, timeouts (seconds), connection retries and circuit breaker for calls to it
+FASTAPI_POOL_SIZE = int(os.getenv("FASTAPI_POOL_SIZE", "20"))
+FASTAPI_CONNECT_TIMEOUT = float(os.getenv("FASTAPI_CONNECT_TIMEOUT", "2"))
+FASTAPI_READ_TIMEOUT = float(os.getenv("FASTAPI_READ_TIMEOUT", "30"))
+FASTAPI_RETRIES = int(os.getenv("FASTAPI_RETRIES", "2"))
+FASTAPI_BREAKER_THRESHOLD = int(os.getenv("FASTAPI_BREAKER_THRESHOLD", "5"))
+FASTAPI_BREAKER_RESET_SECONDS = float(os.getenv("FASTAPI_BREAKER_RESET_SECONDS", "30"))
+
+# Background jobs (store/jobs.py): order confirmation emails etc. run off the request path.
+# Each web process (WSGI/ASGI server or runserver, not other management commands) starts a
+# worker thread at startup unless JOBS_IN_PROCESS_WORKER=False, in which case
+# `python manage.py run_jobs` must be running.
+JOBS_IN_PROCESS_WORKER = os.getenv("JOBS_IN_PROCESS_WORKER", "True") == "True"
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "5"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_BACKOFF_SECONDS = float(os.getenv("JOBS_BACKOFF_SECONDS", "30"))
+JOBS_BACKOFF_MAX_SECONDS = float(os.getenv("JOBS_BACKOFF_MAX_SECONDS", "3600"))
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "300"))
+
+# Cache (catalog pages, home page sections). Local memory by default; point all processes at a
+# shared backend (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379/1) so a catalog change is seen by every worker at once.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "medplus-default"),
+    }
+}
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "chatbot_api": {"handlers": ["console"], "level": os.getenv("CHATBOT_LOG_LEVEL", "INFO")},
+    },
 }
 
 SILENCED_SYSTEM_CHECKS = ["account.W001"]
@@ -2,12 +2,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("store.urls")),
     path("accounts/", include("allauth.urls")),
     path("chat/", include("chatbot.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Medicine, CartItem
+from .models import Medicine, CartItem, Job, Order, OrderLine
 
 @admin.register(Medicine)
 class MedicineAdmin(admin.ModelAdmin):
@@ -11,3 +11,19 @@ class MedicineAdmin(admin.ModelAdmin):
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('medicine', 'quantity')
     search_fields = ('medicine__name',)
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'user', 'total_price', 'created_at')
+    search_fields = ('order_number', 'user__username')
+    inlines = [OrderLineInline]
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('name', 'status')
+    readonly_fields = ('last_error',)
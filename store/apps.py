@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        # Register the background job handlers and the catalog cache invalidation
+        from . import signals, tasks  # noqa: F401
+        from .search import restore_triggers
+
+        # Migrations that remake store_medicine on SQLite drop the FTS sync triggers
+        post_migrate.connect(restore_triggers, sender=self)
+
+        # Pick up jobs queued or waiting for a retry before a restart, without waiting for the
+        # next enqueue; the first poll is delayed until the other apps have finished loading
+        from . import jobs
+        if settings.JOBS_IN_PROCESS_WORKER and jobs.is_web_process():
+            jobs.get_worker().start(delay=settings.JOBS_POLL_SECONDS)
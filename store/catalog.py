@@ -0,0 +1,119 @@
+"""
+Catalog queries behind the product list and home page, cached in the default cache.
+
+Every key embeds the current catalog version; saving or deleting a Medicine bumps the
+version (store/signals.py), which makes all cached results unreachable at once instead
+of tracking which filtered pages a change affects. Entries also expire after
+CATALOG_CACHE_TIMEOUT seconds, which bounds staleness for changes that bypass the
+signals (queryset.update(), raw SQL) or, with a per-process cache, other processes.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+
+from . import search
+from .models import Medicine
+
+VERSION_KEY = "catalog:version"
+PAGE_SIZE = 12
+
+
+def catalog_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use or evicted: start from the clock so old entries can't be reused
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _key(*parts) -> str:
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f"catalog:{catalog_version()}:{digest}"
+
+
+def _cached(key: str, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def search_ids(q: str) -> list:
+    """Ranked full-text matches for `q` (store/search.py), best first."""
+    return _cached(_key('search', q), lambda: search.search_ids(q))
+
+
+def filter_medicines(q=None, category=None, brand=None, min_price=None, max_price=None):
+    """Matching medicines in pk order; `get_medicine_page` orders search results by rank."""
+    medicines = Medicine.objects.all().order_by('pk')
+    if q:
+        medicines = medicines.filter(pk__in=search_ids(q))
+    if category:
+        medicines = medicines.filter(category=category)
+    if brand:
+        medicines = medicines.filter(name__icontains=brand)
+    if min_price:
+        medicines = medicines.filter(price__gte=min_price)
+    if max_price:
+        medicines = medicines.filter(price__lte=max_price)
+    return medicines
+
+
+def _ranked_ids(filters: dict) -> list:
+    """Ids matching `filters`, best search rank first."""
+    rank = {pk: position for position, pk in enumerate(search_ids(filters['q']))}
+    return sorted(filter_medicines(**filters).values_list('pk', flat=True), key=rank.__getitem__)
+
+
+def _in_order(ids) -> list:
+    medicines = Medicine.objects.in_bulk(list(ids))
+    return [medicines[pk] for pk in ids if pk in medicines]
+
+
+def get_medicine_page(filters: dict, page_number, per_page: int = PAGE_SIZE) -> Page:
+    """
+    Same page `Paginator.get_page` returns, with the count and the page's rows cached.
+    Nothing runs on the database (or the search index) when both are cached.
+    """
+    filter_key = tuple(sorted(filters.items()))
+    if filters.get('q'):
+        # Search results: page through the cached ranked ids, then load that page by pk
+        ids = _cached(_key('ids', filter_key), lambda: _ranked_ids(filters))
+        paginator = Paginator(ids, per_page)
+        load_page = _in_order
+    else:
+        medicines = filter_medicines(**filters)
+        paginator = Paginator(medicines, per_page)
+        load_page = list
+        # Paginator.count is a cached_property: prime it instead of running COUNT(*)
+        paginator.__dict__['count'] = _cached(_key('count', filter_key), lambda: medicines.count())
+
+    try:
+        number = paginator.validate_number(page_number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+
+    items = _cached(_key('page', filter_key, per_page, number),
+                    lambda: load_page(paginator.page(number).object_list))
+    return Page(items, number, paginator)
+
+
+def get_home_sections() -> dict:
+    return _cached(_key('home'), lambda: {
+        'featured': list(Medicine.objects.filter(is_featured=True)[:8]),
+        'new_arrivals': list(Medicine.objects.filter(is_new=True).order_by('-created_at')[:8]),
+    })
@@ -0,0 +1,85 @@
+"""
+Invoice PDFs are rendered once per order and kept in the default storage backend
+(MEDIA_ROOT/invoices/ with the file system storage). Each file is named after the order
+and the hash of everything that goes into the invoice, so an order is only re-rendered
+if its content or the invoice template changes, and the hash doubles as the HTTP ETag.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+
+from .models import Order
+
+INVOICE_TEMPLATE = 'email/order_invoice.html'
+
+_template_source_hash = None
+
+
+def _template_fingerprint() -> str:
+    global _template_source_hash
+    if _template_source_hash is None:
+        source = get_template(INVOICE_TEMPLATE).template.source
+        _template_source_hash = hashlib.sha256(source.encode()).hexdigest()
+    return _template_source_hash
+
+
+def invoice_context(order: Order) -> dict:
+    lines = list(order.lines.all())
+    return {
+        "username": order.user.username if order.user else "",
+        "order_id": order.order_number,
+        "order_items": [
+            {"name": line.name, "quantity": line.quantity, "price": line.line_total} for line in lines
+        ],
+        "total_price": order.total_price,
+        "now": order.created_at,
+    }
+
+
+def content_hash(order: Order) -> str:
+    context = invoice_context(order)
+    data = json.dumps({
+        "template": _template_fingerprint(),
+        "username": context["username"],
+        "order_id": context["order_id"],
+        "items": [[i["name"], i["quantity"], str(i["price"])] for i in context["order_items"]],
+        "total": str(context["total_price"]),
+        "created": context["now"].isoformat(),
+    }, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def render_invoice(context: dict) -> bytes:
+    pdf_buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(get_template(INVOICE_TEMPLATE).render(context), dest=pdf_buffer)
+    if pisa_status.err:
+        raise ValueError(f"Error generating invoice PDF ({pisa_status.err} errors)")
+    return pdf_buffer.getvalue()
+
+
+def get_invoice(order: Order, digest: str = None) -> str:
+    """Storage name of the order's invoice PDF, rendering and saving it only if not cached yet."""
+    digest = digest or content_hash(order)
+    if order.invoice and order.invoice_hash == digest and default_storage.exists(order.invoice.name):
+        return order.invoice.name
+
+    name = f"invoices/{order.order_number}-{digest[:16]}.pdf"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(render_invoice(invoice_context(order))))
+
+    stale = order.invoice.name if order.invoice and order.invoice.name != name else None
+    Order.objects.filter(pk=order.pk).update(invoice=name, invoice_hash=digest)
+    order.invoice.name, order.invoice_hash = name, digest
+    if stale:
+        default_storage.delete(stale)
+    return name
+
+
+def get_invoice_bytes(order: Order) -> bytes:
+    with default_storage.open(get_invoice(order), 'rb') as f:
+        return f.read()
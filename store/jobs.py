@@ -0,0 +1,173 @@
+"""
+Small durable job queue: jobs are rows in the store_job table, so nothing is lost on a
+restart and no broker is needed. Any number of workers (a thread inside each web process
+and/or `manage.py run_jobs`) can poll the same table; a job is claimed with a conditional
+UPDATE, so only one of them runs it. Failed jobs are retried with exponential backoff.
+"""
+import os
+import random
+import sys
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+_handlers = {}
+
+
+def register(name: str):
+    """Decorator registering the function that runs jobs called `name` (it receives the payload)."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name: str, payload: dict, max_attempts: int = None) -> Job:
+    job = Job.objects.create(
+        name=name, payload=payload,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_IN_PROCESS_WORKER:
+        # Wake the local worker once the job row is visible to it
+        transaction.on_commit(get_worker().wake)
+    return job
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds before retry number `attempts`: exponential, capped, with jitter."""
+    delay = min(settings.JOBS_BACKOFF_SECONDS * (2 ** (attempts - 1)), settings.JOBS_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_next():
+    """Atomically take the next due job (or one whose worker died), or return None."""
+    now = timezone.now()
+    due = Q(status=Job.STATUS_QUEUED, run_at__lte=now) | Q(status=Job.STATUS_RUNNING, locked_until__lt=now)
+    for job in Job.objects.filter(due).order_by('run_at', 'pk')[:10]:
+        # Only succeeds if nobody claimed (or re-claimed) the job since we read it
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=Job.STATUS_RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job: Job) -> bool:
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job.name}'")
+        handler(job.payload)
+    except Exception as e:
+        error = f"{e}\n{traceback.format_exc()}"
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_FAILED, locked_until=None, last_error=error, updated_at=timezone.now()
+            )
+            print(f"❌ Job {job} failed permanently after {job.attempts} attempts: {e}")
+        else:
+            delay = backoff_delay(job.attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_QUEUED, locked_until=None, last_error=error,
+                run_at=timezone.now() + timedelta(seconds=delay), updated_at=timezone.now(),
+            )
+            print(f"⚠️ Job {job} attempt {job.attempts} failed ({e}); retrying in {delay:.0f}s")
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.STATUS_DONE, locked_until=None, updated_at=timezone.now())
+    return True
+
+
+def run_pending(limit: int = None) -> int:
+    """Run due jobs until the queue is drained (or `limit` jobs ran). Returns how many ran."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+class Worker:
+    """Polls the job table from a daemon thread; `wake()` skips the wait after an enqueue."""
+
+    def __init__(self, poll_interval: float = None):
+        self.poll_interval = poll_interval or settings.JOBS_POLL_SECONDS
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, delay: float = 0):
+        """Start the thread if it isn't running; its first poll waits `delay` seconds (or a wake())."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, args=(delay,), name="store-jobs", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def run(self, delay: float = 0):
+        if delay:
+            self._wakeup.wait(delay)
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                run_pending()
+            except Exception as e:
+                # e.g. database briefly unavailable; try again on the next poll
+                print(f"❌ Job worker error: {e}")
+            finally:
+                close_old_connections()
+            self._wakeup.wait(self.poll_interval)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker() -> Worker:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = Worker()
+    return _worker
+
+
+def is_web_process(argv=None, environ=None) -> bool:
+    """
+    Whether this process serves web requests and should run the in-process worker: any WSGI/ASGI
+    server, or `manage.py runserver` (but not its autoreloader parent). Other management
+    commands (migrate, test, run_jobs, ...) are not.
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    program = os.path.basename(argv[0]) if argv else ""
+    if program not in ("manage.py", "django-admin", "django-admin.py"):
+        return True
+    if len(argv) < 2 or argv[1] != "runserver":
+        return False
+    # With the autoreloader, the parent only watches files; the child (RUN_MAIN) serves
+    return environ.get("RUN_MAIN") == "true" or "--noreload" in argv
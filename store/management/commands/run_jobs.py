@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (order confirmation emails, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due now, then exit.")
+        parser.add_argument('--poll', type=float, default=settings.JOBS_POLL_SECONDS,
+                            help="Seconds to wait between polls when the queue is empty.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = jobs.run_pending()
+            self.stdout.write(f"Ran {count} job(s).")
+            return
+
+        self.stdout.write("Job worker started. Press Ctrl+C to stop.")
+        try:
+            while True:
+                if not jobs.run_pending():
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write("Job worker stopped.")
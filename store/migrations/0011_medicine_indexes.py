@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:08
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_order_orderline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['category', 'price'], name='store_med_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['price'], name='store_med_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['is_featured', 'created_at'], name='store_med_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['is_new', '-created_at'], name='store_med_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='store_med_name_lower_idx'),
+        ),
+    ]
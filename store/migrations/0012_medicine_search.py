@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Frozen copy of the search SQL as of this migration (store/search.py may change later)
+FTS_TABLE = "store_medicine_fts"
+
+PG_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B'))"
+)
+
+SQLITE_SETUP_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, description, content='store_medicine', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_medicine BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_medicine BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_medicine BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_TEARDOWN_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+PG_SETUP_SQL = [f"CREATE INDEX IF NOT EXISTS store_med_search_idx ON store_medicine USING GIN ({PG_VECTOR_SQL})"]
+PG_TEARDOWN_SQL = ["DROP INDEX IF EXISTS store_med_search_idx"]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = PG_SETUP_SQL
+    elif vendor == "sqlite":
+        statements = SQLITE_SETUP_SQL
+    else:
+        return
+    try:
+        for statement in statements:
+            schema_editor.execute(statement)
+    except Exception as e:
+        if vendor != "sqlite":
+            raise
+        # SQLite compiled without FTS5: search falls back to icontains
+        print(f"⚠️ Full-text search unavailable ({e}); using basic product search.")
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {"postgresql": PG_TEARDOWN_SQL, "sqlite": SQLITE_TEARDOWN_SQL}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_medicine_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
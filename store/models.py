@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Medicine(models.Model):
@@ -22,6 +24,18 @@ class Medicine(models.Model):
     is_new = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Category browsing with an optional price range, and price-only filters
+            models.Index(fields=['category', 'price'], name='store_med_category_price_idx'),
+            models.Index(fields=['price'], name='store_med_price_idx'),
+            # Home page sections
+            models.Index(fields=['is_featured', 'created_at'], name='store_med_featured_idx'),
+            models.Index(fields=['is_new', '-created_at'], name='store_med_new_idx'),
+            # Case-insensitive name lookups (exact and prefix matches)
+            models.Index(Lower('name'), name='store_med_name_lower_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -48,4 +62,63 @@ class Address(models.Model):
     default = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"{self.full_name} - {self.street}"
\ No newline at end of file
+        return f"{self.full_name} - {self.street}"
+
+
+class Order(models.Model):
+    """Order placed at checkout; `order_number` is the short id shown to the customer."""
+    order_number = models.CharField(max_length=20, unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Cached invoice PDF (see store/invoices.py) and the hash of the content it was built from
+    invoice = models.FileField(upload_to='invoices/', blank=True)
+    invoice_hash = models.CharField(max_length=64, blank=True)
+
+    def __str__(self):
+        return f"Order {self.order_number}"
+
+
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    # Name and price are copied so the order stays intact if the medicine changes or is deleted
+    medicine = models.ForeignKey(Medicine, on_delete=models.SET_NULL, null=True, blank=True)
+    name = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.name} x {self.quantity}"
+
+
+class Job(models.Model):
+    """Background task (e.g. order confirmation email) run by store.jobs workers."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job whose lease has expired (worker died) is picked up again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,159 @@
+"""
+Ranked full-text search over Medicine names and descriptions.
+
+- SQLite: the store_medicine_fts FTS5 table (external content, kept in sync by triggers),
+  ranked with bm25 and name matches weighted above description matches.
+- PostgreSQL: a GIN expression index over a weighted tsvector (name 'A', description 'B'),
+  ranked with ts_rank.
+- Anything else, or SQLite built without FTS5: plain icontains filtering, name matches first.
+
+Every word of a query matches as a prefix ("para" finds "Paracetamol"). The queries below
+must use the same tsvector expression as the index created by migration 0012 (which keeps
+its own frozen copy of the SQL), so PostgreSQL can match them against it.
+
+SQLite caveat: an AlterField or other operation that remakes store_medicine drops its
+triggers (the FTS table itself survives), after which the index silently stops following
+edits. ensure_triggers() runs after every migrate and puts them back.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Medicine
+
+FTS_TABLE = "store_medicine_fts"
+# Name hits count ten times as much as description hits
+NAME_WEIGHT = 10.0
+MAX_RESULTS = 500
+
+FIELDS = ("name", "description")
+
+PG_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B'))"
+)
+PG_WEIGHTS = {"name": "A", "description": "B"}
+
+# Keeps the external-content FTS table in sync with store_medicine (see ensure_triggers)
+SQLITE_TRIGGER_SQL = {
+    "ai": f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_medicine BEGIN "
+          f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "ad": f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_medicine BEGIN "
+          f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) "
+          f"VALUES ('delete', old.id, old.name, old.description); END",
+    "au": f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_medicine BEGIN "
+          f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) "
+          f"VALUES ('delete', old.id, old.name, old.description); "
+          f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+}
+
+_fts_available = None
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def backend() -> str:
+    """'fts5', 'postgres' or 'basic' for the default database."""
+    global _fts_available
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if connection.vendor == "sqlite":
+        if _fts_available is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _fts_available = cursor.fetchone() is not None
+        if _fts_available:
+            return "fts5"
+    return "basic"
+
+
+def _fts5_query(tokens, fields, match_any) -> str:
+    terms = f" {'OR' if match_any else 'AND'} ".join(f'"{token}"*' for token in tokens)
+    if set(fields) == set(FIELDS):
+        return terms
+    return "{" + " ".join(fields) + "} : (" + terms + ")"
+
+
+def _pg_query(tokens, fields, match_any) -> str:
+    weights = "".join(PG_WEIGHTS[field] for field in fields)
+    suffix = ":*" if set(fields) == set(FIELDS) else f":*{weights}"
+    return f" {'|' if match_any else '&'} ".join(f"{token}{suffix}" for token in tokens)
+
+
+def search_ids(text: str, fields=FIELDS, match_any: bool = False, limit: int = MAX_RESULTS) -> list:
+    """
+    Ids of the medicines matching `text`, best first. By default every word must match
+    (in any of `fields`); with `match_any` one matching word is enough.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+
+    kind = backend()
+    if kind == "fts5":
+        sql = (f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+               f"ORDER BY bm25({FTS_TABLE}, {NAME_WEIGHT}, 1.0), rowid LIMIT %s")
+        params = [_fts5_query(tokens, fields, match_any), limit]
+    elif kind == "postgres":
+        sql = (f"SELECT id FROM store_medicine WHERE {PG_VECTOR_SQL} @@ to_tsquery('simple', %s) "
+               f"ORDER BY ts_rank({PG_VECTOR_SQL}, to_tsquery('simple', %s)) DESC, id LIMIT %s")
+        query = _pg_query(tokens, fields, match_any)
+        params = [query, query, limit]
+    else:
+        return _basic_search_ids(tokens, fields, match_any, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _basic_search_ids(tokens, fields, match_any, limit) -> list:
+    def word_filter(token):
+        return Q(**{f"{fields[0]}__icontains": token}) if len(fields) == 1 else \
+            Q(name__icontains=token) | Q(description__icontains=token)
+
+    condition = Q()
+    for token in tokens:
+        condition = (condition | word_filter(token)) if match_any else (condition & word_filter(token))
+    matches = Medicine.objects.filter(condition).order_by('pk')
+    if "name" in fields:
+        name_hits = Q()
+        for token in tokens:
+            name_hits |= Q(name__icontains=token)
+        ids = list(matches.filter(name_hits).values_list('pk', flat=True)[:limit])
+        ids += list(matches.exclude(name_hits).values_list('pk', flat=True)[:limit - len(ids)])
+        return ids
+    return list(matches.values_list('pk', flat=True)[:limit])
+
+
+def ensure_triggers(using="default") -> bool:
+    """
+    Re-create any missing FTS sync triggers on SQLite and rebuild the index from
+    store_medicine. Returns True if anything had to be repaired.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite":
+        return False
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE %s", [f"{FTS_TABLE}%"])
+        present = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in present:
+            return False
+        missing = [suffix for suffix in SQLITE_TRIGGER_SQL if f"{FTS_TABLE}_{suffix}" not in present]
+        if not missing:
+            return False
+        for suffix in missing:
+            cursor.execute(SQLITE_TRIGGER_SQL[suffix])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    print(f"🔧 Restored the {FTS_TABLE} triggers and rebuilt the search index.")
+    return True
+
+
+def restore_triggers(sender, using="default", **kwargs):
+    """post_migrate receiver (see StoreConfig.ready)."""
+    global _fts_available
+    _fts_available = None  # the migrations may have created or dropped the FTS table
+    ensure_triggers(using)
@@ -0,0 +1,88 @@
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from .models import CartItem, Order, OrderLine
+
+CENT = Decimal('0.01')
+
+# quantity * unit price, computed by the database
+LINE_TOTAL = ExpressionWrapper(
+    F('quantity') * F('medicine__price'),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+class CartSummary:
+    """Cart lines (each with `line_total`), number of lines and grand total."""
+
+    def __init__(self, items, total):
+        self.items = items
+        self.count = len(items)
+        self.total = total
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def cart_owner(user_id=None, session_id=None) -> dict:
+    """
+    CartItem lookup for a logged-in user, else an anonymous session (or the legacy
+    session-less cart). Also usable with get_or_create, which creates the line for that owner.
+    """
+    if user_id:
+        return {'user_id': user_id}
+    if session_id:
+        return {'session_id': session_id}
+    return {'session_id__isnull': True}
+
+
+def get_cart_queryset(user_id=None, session_id=None):
+    """Cart of a logged-in user, else of an anonymous session (or the legacy session-less cart)."""
+    return CartItem.objects.filter(**cart_owner(user_id, session_id))
+
+
+def with_line_totals(queryset):
+    return queryset.select_related('medicine').annotate(line_total=LINE_TOTAL)
+
+
+def get_cart_summary(queryset) -> CartSummary:
+    """Fetch the lines with their medicine and line total in a single query."""
+    items = list(with_line_totals(queryset))
+    for item in items:
+        # SQLite hands back the product unscaled (e.g. 11 instead of 11.00)
+        item.line_total = Decimal(item.line_total).quantize(CENT)
+    return CartSummary(items, sum((item.line_total for item in items), Decimal('0')))
+
+
+def get_cart_total(queryset) -> Decimal:
+    """Grand total as one aggregate query."""
+    total = queryset.aggregate(total=Sum(LINE_TOTAL))['total']
+    return Decimal(total).quantize(CENT) if total is not None else Decimal('0')
+
+
+def _new_order_number() -> str:
+    while True:
+        order_number = uuid.uuid4().hex[:8].upper()
+        if not Order.objects.filter(order_number=order_number).exists():
+            return order_number
+
+
+def place_order(user, queryset):
+    """Turn the cart into an Order with its lines and empty the cart, atomically. None if the cart is empty."""
+    with transaction.atomic():
+        cart = get_cart_summary(queryset)
+        if not cart:
+            return None
+        order = Order.objects.create(order_number=_new_order_number(), user=user, total_price=cart.total)
+        OrderLine.objects.bulk_create([
+            OrderLine(
+                order=order, medicine=item.medicine, name=item.medicine.name, quantity=item.quantity,
+                unit_price=item.medicine.price, line_total=item.line_total,
+            ) for item in cart.items
+        ])
+        # Only the lines that were ordered (not items added meanwhile from another tab)
+        CartItem.objects.filter(pk__in=[item.pk for item in cart.items]).delete()
+    return order
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+from . import jobs
+from .invoices import get_invoice_bytes, invoice_context
+from .models import Order
+
+ORDER_CONFIRMATION = "order_confirmation"
+
+
+def enqueue_order_confirmation(context: dict, user_email: str):
+    """Queue the confirmation email + invoice PDF for an order (see `send_order_confirmation`)."""
+    payload = {
+        "order_id": context["order_id"],
+        "user_email": user_email,
+        "home_url": context["home_url"],
+        "pdf_url": context["pdf_url"],
+    }
+    return jobs.enqueue(ORDER_CONFIRMATION, payload)
+
+
+@jobs.register(ORDER_CONFIRMATION)
+def send_order_confirmation(payload: dict):
+    order = Order.objects.select_related('user').get(order_number=payload["order_id"])
+    context = dict(invoice_context(order), home_url=payload["home_url"], pdf_url=payload["pdf_url"])
+    order_id = context["order_id"]
+    order_summary = context["order_items"]
+
+    # Generate email
+    subject = f"Order Confirmation - {order_id}"
+    html_content = render_to_string("email/order_confirmation_email.html", context)
+    text_content = f"Thank you {context['username']} for your order!\n" + \
+                   "\n".join([f"{i['name']} x {i['quantity']} = ${i['price']}" for i in order_summary]) + \
+                   f"\nTotal: ${context['total_price']}"
+
+    msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [payload["user_email"]])
+    msg.attach_alternative(html_content, "text/html")
+    # Same cached PDF the invoice download serves
+    try:
+        msg.attach(f"Invoice_{order_id}.pdf", get_invoice_bytes(order), "application/pdf")
+    except ValueError as e:
+        print(f"⚠️ Sending confirmation for {order_id} without invoice: {e}")
+    # Errors propagate so the job is retried
+    msg.send()
+    print(f"✅ Email sent successfully to {payload['user_email']}")
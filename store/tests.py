@@ -1,3 +1,264 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs, search
+from .catalog import get_medicine_page
+from .models import CartItem, Job, Medicine, Order, OrderLine
+from .services import get_cart_queryset, get_cart_summary, get_cart_total, place_order
+
+User = get_user_model()
+
+
+def make_medicine(name, description="", price="5.00", category="Other", **kwargs):
+    return Medicine.objects.create(name=name, description=description, price=Decimal(price),
+                                   category=category, **kwargs)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.paracetamol = make_medicine("Paracetamol 500mg", "Pain and fever relief")
+        self.ibuprofen = make_medicine("Ibuprofen 200mg", "Anti-inflammatory for pain, also eases fever")
+        self.vitamin = make_medicine("Vitamin C", "Immune support")
+
+    def test_prefix_match_on_name(self):
+        self.assertEqual(search.search_ids("para"), [self.paracetamol.pk])
+
+    def test_every_word_must_match_by_default(self):
+        self.assertEqual(search.search_ids("vitamin fever"), [])
+        self.assertCountEqual(search.search_ids("vitamin fever", match_any=True),
+                              [self.vitamin.pk, self.paracetamol.pk, self.ibuprofen.pk])
+
+    def test_name_hits_rank_above_description_hits(self):
+        pain = make_medicine("Pain Relief Gel", "Topical gel")
+        ids = search.search_ids("pain")
+        self.assertEqual(ids[0], pain.pk)
+        self.assertCountEqual(ids[1:], [self.paracetamol.pk, self.ibuprofen.pk])
+
+    def test_description_only_search(self):
+        self.assertCountEqual(search.search_ids("fever", fields=("description",)),
+                              [self.paracetamol.pk, self.ibuprofen.pk])
+        self.assertEqual(search.search_ids("vitamin", fields=("description",)), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.vitamin.name = "Ascorbic Acid"
+        self.vitamin.save()
+        self.assertEqual(search.search_ids("vitamin"), [])
+        self.assertEqual(search.search_ids("ascorbic"), [self.vitamin.pk])
+
+        self.paracetamol.delete()
+        self.assertEqual(search.search_ids("paracetamol"), [])
+        self.assertEqual(search.search_ids("fever"), [self.ibuprofen.pk])
+
+    def test_dropped_triggers_are_restored(self):
+        # What a table remake (AlterField on SQLite) leaves behind
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_ai")
+            cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_au")
+        missed = make_medicine("Loratadine", "Allergy relief")
+
+        self.assertTrue(search.ensure_triggers())
+        self.assertFalse(search.ensure_triggers())
+        self.assertEqual(search.search_ids("loratadine"), [missed.pk])
+        self.vitamin.name = "Ascorbic Acid"
+        self.vitamin.save()
+        self.assertEqual(search.search_ids("ascorbic"), [self.vitamin.pk])
+
+
+class CatalogPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.medicines = [make_medicine(f"Cough Syrup {i}", price=f"{i + 1}.00") for i in range(15)]
+        self.exact = make_medicine("Cough", "Cough relief")
+
+    def test_search_results_are_ranked_and_paginated(self):
+        page = get_medicine_page({"q": "cough"}, 1)
+        self.assertEqual(page.paginator.count, 16)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(len(page.object_list), 12)
+        # Shortest name scores highest with bm25
+        self.assertEqual(page.object_list[0], self.exact)
+
+    def test_filters_combine_with_search(self):
+        page = get_medicine_page({"q": "cough", "max_price": "3"}, 1)
+        self.assertCountEqual(page.object_list, self.medicines[:3])
+
+    def test_cached_pages_run_no_queries(self):
+        # 15 syrups, 16 medicines in "Other": page 2 holds the rest after 12
+        for filters, rest in (({"q": "syrup"}, 3), ({"category": "Other"}, 4)):
+            get_medicine_page(filters, 2)
+            with self.assertNumQueries(0):
+                page = get_medicine_page(filters, 2)
+            self.assertEqual(len(page.object_list), rest)
+
+    def test_saving_a_medicine_invalidates_cached_pages(self):
+        get_medicine_page({"q": "syrup"}, 1)
+        make_medicine("Cough Syrup Extra")
+        self.assertEqual(get_medicine_page({"q": "syrup"}, 1).paginator.count, 16)
+
+
+class CartServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", "alice@example.com", "pw")
+        aspirin = make_medicine("Aspirin", price="2.50")
+        syrup = make_medicine("Cough Syrup", price="7.25")
+        CartItem.objects.create(user=self.user, medicine=aspirin, quantity=3)
+        CartItem.objects.create(user=self.user, medicine=syrup, quantity=2)
+        # Someone else's cart must not leak in
+        CartItem.objects.create(session_id="other", medicine=syrup, quantity=9)
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            cart = get_cart_summary(get_cart_queryset(user_id=self.user.pk))
+            names = [item.medicine.name for item in cart.items]
+        self.assertCountEqual(names, ["Aspirin", "Cough Syrup"])
+        self.assertEqual(sorted(item.line_total for item in cart.items), [Decimal("7.50"), Decimal("14.50")])
+        self.assertEqual(cart.total, Decimal("22.00"))
+        self.assertEqual(cart.count, 2)
+
+    def test_total_is_one_aggregate_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_cart_total(get_cart_queryset(user_id=self.user.pk)), Decimal("22.00"))
+        self.assertEqual(get_cart_total(get_cart_queryset(session_id="nobody")), Decimal("0"))
+
+    def test_place_order_copies_lines_and_empties_the_cart(self):
+        order = place_order(self.user, get_cart_queryset(user_id=self.user.pk))
+        self.assertEqual(order.total_price, Decimal("22.00"))
+        self.assertCountEqual(order.lines.values_list("name", "quantity", "line_total"),
+                              [("Aspirin", 3, Decimal("7.50")), ("Cough Syrup", 2, Decimal("14.50"))])
+        self.assertFalse(get_cart_queryset(user_id=self.user.pk).exists())
+        self.assertTrue(get_cart_queryset(session_id="other").exists())
+        self.assertIsNone(place_order(self.user, get_cart_queryset(user_id=self.user.pk)))
+
+
+@override_settings(JOBS_IN_PROCESS_WORKER=False, JOBS_BACKOFF_SECONDS=30, JOBS_BACKOFF_MAX_SECONDS=3600)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        handlers = mock.patch.dict(jobs._handlers, {"flaky": self.flaky})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def flaky(self, payload):
+        self.calls.append(payload)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("mail server down")
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_backoff_doubles_and_is_capped(self):
+        for attempts, base in ((1, 30), (2, 60), (3, 120), (10, 3600), (30, 3600)):
+            delay = jobs.backoff_delay(attempts)
+            self.assertGreaterEqual(delay, base * 0.8)
+            self.assertLessEqual(delay, base * 1.2)
+
+    def test_failed_job_is_retried_later(self):
+        self.failures = 1
+        job = jobs.enqueue("flaky", {"order_id": "A1"}, max_attempts=3)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertIn("mail server down", job.last_error)
+        wait = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(20 < wait <= 36, wait)
+        # Not due yet
+        self.assertEqual(jobs.run_pending(), 0)
+
+        self.make_due(job)
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DONE, 2))
+        self.assertEqual(self.calls, [{"order_id": "A1"}] * 2)
+
+    def test_job_fails_permanently_after_max_attempts(self):
+        self.failures = 10
+        job = jobs.enqueue("flaky", {}, max_attempts=2)
+        jobs.run_pending()
+        self.make_due(job)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.make_due(job)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_expired_lease_is_claimed_again(self):
+        job = jobs.enqueue("flaky", {})
+        Job.objects.filter(pk=job.pk).update(status=Job.STATUS_RUNNING, attempts=1,
+                                             locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DONE, 2))
+
+    def test_running_job_is_not_claimed_twice(self):
+        jobs.enqueue("flaky", {})
+        self.assertIsNotNone(jobs.claim_next())
+        self.assertIsNone(jobs.claim_next())
+
+    def test_worker_runs_only_in_web_processes(self):
+        self.assertTrue(jobs.is_web_process(["gunicorn", "pharmacy.wsgi"], {}))
+        self.assertTrue(jobs.is_web_process(["manage.py", "runserver"], {"RUN_MAIN": "true"}))
+        self.assertTrue(jobs.is_web_process(["manage.py", "runserver", "--noreload"], {}))
+        # Autoreloader parent and other management commands
+        self.assertFalse(jobs.is_web_process(["manage.py", "runserver"], {}))
+        for command in ("migrate", "test", "run_jobs", "shell"):
+            self.assertFalse(jobs.is_web_process(["manage.py", command], {}))
+
+
+class InvoiceViewTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_settings = override_settings(MEDIA_ROOT=media)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        self.order = Order.objects.create(order_number="INV12345", user=self.owner, total_price=Decimal("5.00"))
+        OrderLine.objects.create(order=self.order, name="Aspirin", quantity=2,
+                                 unit_price=Decimal("2.50"), line_total=Decimal("5.00"))
+        self.url = reverse("order_invoice_pdf", args=[self.order.order_number])
+
+    def test_owner_gets_the_pdf_then_304(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        etag = response["ETag"]
+
+        with mock.patch("store.views.get_invoice") as get_invoice:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        get_invoice.assert_not_called()
+
+    def test_etag_changes_with_the_order(self):
+        self.client.force_login(self.owner)
+        etag = self.client.get(self.url)["ETag"]
+        Order.objects.filter(pk=self.order.pk).update(total_price=Decimal("6.00"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_other_users_get_404(self):
+        self.client.force_login(User.objects.create_user("mallory", "mallory@example.com", "pw"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        missing = reverse("order_invoice_pdf", args=["NOPE0000"])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_anonymous_users_are_sent_to_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("account_login"), response["Location"])
@@ -2,46 +2,48 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.template.loader import render_to_string
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_POST
+from django.http import JsonResponse, HttpResponse, FileResponse
+from django.views.decorators.http import require_POST, condition
+from django.core.files.storage import default_storage
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives, send_mail
-from django.utils import timezone
+from django.core.mail import send_mail
 import stripe
 import random
-import uuid
-from io import BytesIO
 import requests
-from xhtml2pdf import pisa
 
 
-from .models import Medicine, CartItem, Address
+from .models import Medicine, CartItem, Address, Order
 from .forms import SignupForm, LoginForm, AddressForm
+from .services import cart_owner, get_cart_queryset, get_cart_summary, place_order
+from .catalog import get_home_sections, get_medicine_page
+from .invoices import content_hash, get_invoice
+from .tasks import enqueue_order_confirmation
+from chatbot.client import get_bot_client
 
 User = get_user_model()
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 # ---------- HELPER ----------
-def _get_cart_queryset(request):
+def _cart_owner(request) -> dict:
     if request.user.is_authenticated:
-        return CartItem.objects.filter(user=request.user)
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        return CartItem.objects.filter(session_id=request.session.session_key)
+        return cart_owner(user_id=request.user.id)
+    if not request.session.session_key:
+        request.session.create()
+    return cart_owner(session_id=request.session.session_key)
+
+def _get_cart_queryset(request):
+    return get_cart_queryset(**_cart_owner(request))
 
 def _cart_count(request):
     return _get_cart_queryset(request).count()
 
 # ---------- HOME ----------
 def home(request):
-    featured = Medicine.objects.filter(is_featured=True)[:8]
-    new_arrivals = Medicine.objects.filter(is_new=True).order_by('-created_at')[:8]
+    sections = get_home_sections()
     return render(request, 'store/home.html', {
-        'featured': featured,
-        'new_arrivals': new_arrivals,
+        'featured': sections['featured'],
+        'new_arrivals': sections['new_arrivals'],
         'categories': Medicine.CATEGORY_CHOICES,
         'cart_count': _cart_count(request),
     })
@@ -83,27 +85,12 @@ def logout_view(request):
 
 # ---------- PRODUCT LIST ----------
 def product_list(request):
-    q = request.GET.get('q')
-    category = request.GET.get('category')
-    brand = request.GET.get('brand')
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-
-    medicines = Medicine.objects.all().order_by('pk')
-    if q:
-        medicines = medicines.filter(name__icontains=q)
-    if category:
-        medicines = medicines.filter(category=category)
-    if brand:
-        medicines = medicines.filter(name__icontains=brand)
-    if min_price:
-        medicines = medicines.filter(price__gte=min_price)
-    if max_price:
-        medicines = medicines.filter(price__lte=max_price)
-
-    paginator = Paginator(medicines, 12)
-    page = request.GET.get('page')
-    meds_page = paginator.get_page(page)
+    filters = {
+        key: request.GET.get(key)
+        for key in ('q', 'category', 'brand', 'min_price', 'max_price')
+    }
+    # Filtered page and its count come from the versioned catalog cache
+    meds_page = get_medicine_page(filters, request.GET.get('page'))
 
     return render(request, 'store/product_list.html', {
         'medicines': meds_page,
@@ -121,15 +108,14 @@ def product_detail(request, pk):
 
 # ---------- CART ----------
 def cart(request):
-    items = _get_cart_queryset(request).select_related('medicine')
-    print(f"DEBUG: Cart items count: {items.count()}")
-    for item in items:
+    cart = get_cart_summary(_get_cart_queryset(request))
+    print(f"DEBUG: Cart items count: {cart.count}")
+    for item in cart.items:
         print(f"DEBUG: Item: {item.medicine.name}, Price: {item.medicine.price}, Qty: {item.quantity}")
-    total = sum([item.get_total_price() for item in items])
     return render(request, 'store/cart.html', {
-        'items': items,
-        'total': total,
-        'cart_count': _cart_count(request)
+        'items': cart.items,
+        'total': cart.total,
+        'cart_count': cart.count
     })
 
 @require_POST
@@ -157,9 +143,8 @@ def update_cart(request):
 
 # ---------- MINI CART ----------
 def mini_cart(request):
-    items = _get_cart_queryset(request).select_related('medicine')
-    total = sum([it.get_total_price() for it in items])
-    html = render_to_string('store/partials/_mini_cart.html', {'items': items, 'total': total}, request=request)
+    cart = get_cart_summary(_get_cart_queryset(request))
+    html = render_to_string('store/partials/_mini_cart.html', {'items': cart.items, 'total': cart.total}, request=request)
     return HttpResponse(html)
 
 # ---------- ADD TO CART ----------
@@ -181,10 +166,7 @@ def add_to_cart(request, medicine_id):
         item.save()
     else:
         # Create new item with correct links
-        if request.user.is_authenticated:
-            item = CartItem.objects.create(medicine_id=medicine_id, user=request.user, quantity=quantity)
-        else:
-            item = CartItem.objects.create(medicine_id=medicine_id, session_id=request.session.session_key, quantity=quantity)
+        item = CartItem.objects.create(medicine_id=medicine_id, quantity=quantity, **_cart_owner(request))
 
     return redirect('cart')
 
@@ -201,17 +183,14 @@ def add_to_cart_ajax(request, medicine_id):
         item.quantity += quantity
         item.save()
     else:
-        if request.user.is_authenticated:
-            item = CartItem.objects.create(medicine_id=medicine_id, user=request.user, quantity=quantity)
-        else:
-            item = CartItem.objects.create(medicine_id=medicine_id, session_id=request.session.session_key, quantity=quantity)
+        item = CartItem.objects.create(medicine_id=medicine_id, quantity=quantity, **_cart_owner(request))
 
-    items = _get_cart_queryset(request).select_related('medicine')
+    cart = get_cart_summary(_get_cart_queryset(request))
     mini_html = render_to_string('store/partials/_mini_cart.html', {
-        'items': items,
-        'total': sum([float(it.get_total_price()) for it in items])
+        'items': cart.items,
+        'total': float(cart.total)
     }, request=request)
-    return JsonResponse({'success': True, 'mini_cart_html': mini_html, 'cart_count': _cart_count(request)})
+    return JsonResponse({'success': True, 'mini_cart_html': mini_html, 'cart_count': cart.count})
 
 # ---------- QUICK VIEW ----------
 def quick_view(request, pk):
@@ -223,19 +202,20 @@ def quick_view(request, pk):
 @login_required(login_url='account_login')
 @login_required(login_url='account_login')
 def checkout(request):
-    items = _get_cart_queryset(request).select_related('medicine')
+    cart = get_cart_summary(_get_cart_queryset(request))
+    items = cart.items
     
     # Check if cart is empty
-    if not items.exists():
+    if not cart:
         messages.warning(request, "Your cart is empty. Please add items before checking out.")
         return redirect('cart')
     
-    total_amount = sum([item.get_total_price() for item in items])
+    total_amount = cart.total
     addresses = Address.objects.filter(user=request.user)
 
     if request.method == 'POST':
         # Double-check cart isn't empty on POST
-        if not items.exists():
+        if not _get_cart_queryset(request).exists():
             messages.warning(request, "Your cart is empty. Please add items before checking out.")
             return redirect('cart')
             
@@ -252,7 +232,7 @@ def checkout(request):
                 messages.error(request, "Please fill all required address fields.")
                 return render(request, 'store/checkout.html', {
                     'items': items, 'total': total_amount, 'addresses': addresses,
-                    'form': form, 'cart_count': _cart_count(request),
+                    'form': form, 'cart_count': cart.count,
                     'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
                 })
 
@@ -276,7 +256,7 @@ def checkout(request):
 
     return render(request, 'store/checkout.html', {
         'items': items, 'total': total_amount, 'addresses': addresses,
-        'form': form, 'cart_count': _cart_count(request),
+        'form': form, 'cart_count': cart.count,
         'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
     })
 
@@ -284,26 +264,18 @@ def checkout(request):
 @login_required(login_url='account_login')
 def success(request):
     user_email = request.user.email
-    cart_items = _get_cart_queryset(request).select_related('medicine')
-    if not cart_items.exists():
+    # Save the order and empty the cart
+    order = place_order(request.user, _get_cart_queryset(request))
+    if order is None:
         messages.info(request, "Your cart is empty.")
         return redirect('home')
 
-    # Order summary with float conversion
+    order_id = order.order_number
     order_summary = [
-        {
-            "name": item.medicine.name,
-            "quantity": item.quantity,
-            "price": float(item.get_total_price())
-        } for item in cart_items
+        {"name": line.name, "quantity": line.quantity, "price": line.line_total}
+        for line in order.lines.all()
     ]
-    total_price = sum(item["price"] for item in order_summary)
-
-    # Generate unique Order ID
-    order_id = str(uuid.uuid4()).split('-')[0].upper()
-
-    # Save order_summary in session for PDF download later
-    request.session[f"order_{order_id}"] = order_summary
+    total_price = order.total_price
 
     # Email context
     context = {
@@ -312,41 +284,19 @@ def success(request):
         "order_items": order_summary,
         "total_price": total_price,
         "home_url": request.build_absolute_uri('/'),
-        "now": timezone.now(),
+        "now": order.created_at,
         "pdf_url": request.build_absolute_uri(f'/orders/{order_id}/invoice/'),
     }
 
-    # Generate email
-    subject = f"Order Confirmation - {order_id}"
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to_email = [user_email]
-
-    html_content = render_to_string("email/order_confirmation_email.html", context)
-    text_content = f"Thank you {request.user.username} for your order!\n" + \
-                   "\n".join([f"{i['name']} x {i['quantity']} = ${i['price']}" for i in order_summary]) + \
-                   f"\nTotal: ${total_price}"
-
-    # Generate PDF
-    pdf_buffer = BytesIO()
-    pdf_html = render_to_string("email/order_invoice.html", context)
-    pisa_status = pisa.CreatePDF(pdf_html, dest=pdf_buffer)
-    pdf_buffer.seek(0)
-
+    # Email + invoice PDF are produced by a background job (store/tasks.py), so a slow
+    # mail server can't hold up the checkout
     try:
-        msg = EmailMultiAlternatives(subject, text_content, from_email, to_email)
-        msg.attach_alternative(html_content, "text/html")
-        if not pisa_status.err:
-            msg.attach(f"Invoice_{order_id}.pdf", pdf_buffer.read(), "application/pdf")
-        msg.send()
-        messages.success(request, f"Order confirmation email sent to {user_email}")
-        print(f"✅ Email sent successfully to {user_email}")
+        enqueue_order_confirmation(context, user_email)
+        messages.success(request, f"Order confirmation email will be sent to {user_email}")
     except Exception as e:
-        print(f"❌ Email sending failed: {e}")
+        print(f"❌ Could not queue confirmation email: {e}")
         messages.warning(request, f"Order placed successfully, but we couldn't send the confirmation email. Please contact support with Order ID: {order_id}")
 
-    # Clear cart
-    _get_cart_queryset(request).delete()
-
     return render(request, "store/success.html", {
         "cart_count": 0,
         "order_summary": order_summary,
@@ -355,31 +305,31 @@ def success(request):
     })
 
 # ---------- PDF INVOICE ----------
+def _invoice_etag(request, order_id):
+    order = Order.objects.filter(order_number=order_id, user_id=request.user.id).first()
+    if order is None:
+        return None
+    # Computed once here and reused by the view
+    request.invoice_order = order
+    request.invoice_hash = content_hash(order)
+    return request.invoice_hash
+
 @login_required(login_url='account_login')
+@condition(etag_func=_invoice_etag)
 def order_invoice_pdf(request, order_id):
-    order_items = request.session.get(f"order_{order_id}", [])
-    if not order_items:
+    order = getattr(request, 'invoice_order', None)
+    if order is None:
         return HttpResponse("No order found for this invoice.", status=404)
 
-    total_price = sum(float(item['price']) for item in order_items)
-    context = {
-        "username": request.user.username,
-        "order_id": order_id,
-        "order_items": order_items,
-        "total_price": total_price,
-        "now": timezone.now(),
-    }
-
-    pdf_buffer = BytesIO()
-    html_string = render_to_string('email/order_invoice.html', context)
-    pisa_status = pisa.CreatePDF(html_string, dest=pdf_buffer)
-    pdf_buffer.seek(0)
-
-    if pisa_status.err:
+    try:
+        name = get_invoice(order, request.invoice_hash)
+    except ValueError:
         return HttpResponse("Error generating PDF", status=500)
 
-    response = HttpResponse(pdf_buffer.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Invoice_{order_id}.pdf"'
+    # The cached file is streamed as is; browsers revalidate with If-None-Match and get a 304
+    response = FileResponse(default_storage.open(name, 'rb'), as_attachment=True,
+                            filename=f"Invoice_{order_id}.pdf", content_type='application/pdf')
+    response['Cache-Control'] = 'private, no-cache'
     return response
 
 # ---------- CHATBOT PRESCRIPTION PROXY ----------
@@ -404,10 +354,8 @@ def process_prescription_chat(request):
         files = {'file': (uploaded_file.name, uploaded_file.read(), uploaded_file.content_type)}
         data = {'session_id': session_id} if session_id else {}
         
-        fastapi_url = f"{settings.FASTAPI_URL}/prescription"
-        
         try:
-            response = requests.post(fastapi_url, files=files, data=data, timeout=10)
+            response = get_bot_client().post("/prescription", files=files, data=data, read_timeout=10)
             try:
                 return JsonResponse(response.json(), status=response.status_code)
             except ValueError:
@@ -431,10 +379,9 @@ def upload_prescription(request):
         
         # Prepare file for FastAPI
         files = {'file': (uploaded_file.name, uploaded_file.read(), uploaded_file.content_type)}
-        fastapi_url = f"{settings.FASTAPI_URL}/prescription"
         
         try:
-            response = requests.post(fastapi_url, files=files, timeout=10)
+            response = get_bot_client().post("/prescription", files=files, read_timeout=10)
             response.raise_for_status()
             result = response.json()
             
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from chatbot_api.scripts import build_corpus
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Wikipedia summary + OpenFDA label endpoints; topics in `failing` always answer 503."""
+
+    failing = set()
+    hits = []
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/wiki/page/summary/"):
+            topic = unquote(url.path.rsplit("/", 1)[1])
+        elif url.path == "/fda/drug/label.json":
+            topic = parse_qs(url.query)["search"][0].split(":", 1)[1].strip('"')
+        else:
+            return self.send(404, {})
+        self.hits.append(topic)
+        if topic in self.failing:
+            return self.send(503, {"error": "busy"})
+        if url.path.startswith("/wiki/"):
+            if topic == "NoWiki":
+                return self.send(404, {})
+            return self.send(200, {"pageid": len(topic), "title": topic, "extract": f"{topic} summary.",
+                                   "content_urls": {"desktop": {"page": f"http://wiki/{topic}"}}})
+        return self.send(200, {"results": [{"indications_and_usage": [f"Treats {topic}."],
+                                            "warnings": ["None."], "dosage_and_administration": ["Once daily."]}]})
+
+
+class BuildCorpusTests(unittest.TestCase):
+    TOPICS = ["Aspirin", "Ibuprofen", "NoWiki", "Metformin"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.wiki_url, cls.fda_url = f"{base}/wiki", f"{base}/fda"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmp, "health_data.json")
+        self.checkpoint = os.path.join(self.tmp, "health_data.jsonl")
+        self.cache = os.path.join(self.tmp, "cache")
+        StubAPI.failing = set()
+        StubAPI.hits = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def build(self, topics=None, fresh=False):
+        return build_corpus.build_corpus(topics or self.TOPICS, self.output, self.checkpoint, self.cache,
+                                         workers=4, rate=0, fresh=fresh,
+                                         wiki_url=self.wiki_url, fda_url=self.fda_url)
+
+    def corpus(self):
+        with open(self.output, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_builds_corpus_in_topic_order(self):
+        self.assertEqual(self.build(), [])
+        # FDA documents are titled "<topic> Label Information"
+        titles = [doc["title"].split()[0] for doc in self.corpus()]
+        self.assertEqual(titles, ["Aspirin", "Aspirin", "Ibuprofen", "Ibuprofen", "NoWiki", "Metformin", "Metformin"])
+        self.assertIn("**Drug Info for NoWiki**", self.corpus()[4]["text"])
+
+    def test_rebuild_is_served_from_cache(self):
+        self.build()
+        first = self.corpus()
+        StubAPI.hits = []
+        self.assertEqual(self.build(fresh=True), [])
+        self.assertEqual(StubAPI.hits, [])
+        self.assertEqual(self.corpus(), first)
+
+    def test_resume_only_fetches_missing_topics(self):
+        self.build(topics=self.TOPICS[:2])
+        StubAPI.hits = []
+        self.build()
+        self.assertEqual(set(StubAPI.hits), {"NoWiki", "Metformin"})
+        self.assertEqual(len(self.corpus()), 7)
+
+    def test_failed_topic_keeps_previous_corpus(self):
+        self.build()
+        previous = self.corpus()
+
+        StubAPI.failing = {"Ibuprofen"}
+        shutil.rmtree(self.cache)
+        self.assertEqual(self.build(fresh=True), ["Ibuprofen"])
+        self.assertEqual(self.corpus(), previous)
+
+        # The failure wasn't checkpointed: the next run fetches just that topic
+        StubAPI.failing = set()
+        StubAPI.hits = []
+        self.assertEqual(self.build(), [])
+        self.assertEqual(set(StubAPI.hits), {"Ibuprofen"})
+        self.assertEqual(self.corpus(), previous)
+
+
+if __name__ == "__main__":
+    unittest.main()
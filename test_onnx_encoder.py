@@ -0,0 +1,88 @@
+import importlib.util
+import json
+import os
+import unittest
+
+import numpy as np
+
+from chatbot_api.app.onnx_encoder import DEFAULT_MODEL_PATH
+
+MODEL_PATH = os.getenv("HEALTHBOT_ONNX_MODEL") or DEFAULT_MODEL_PATH
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "chatbot_api", "corpus", "cleaned", "health_data.json")
+# Same gate as chatbot_api/scripts/bench_encoder.py --min-cosine
+MIN_MEAN_COSINE = 0.99
+MIN_COSINE = 0.95
+
+
+def installed(*modules):
+    return all(importlib.util.find_spec(m) is not None for m in modules)
+
+
+HAS_ONNX = os.path.exists(MODEL_PATH) and installed("onnxruntime", "tokenizers")
+HAS_TORCH = installed("sentence_transformers")
+
+
+@unittest.skipUnless(HAS_ONNX, f"no ONNX encoder at {MODEL_PATH} (run chatbot_api/scripts/export_onnx.py)")
+class OnnxEncoderTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from chatbot_api.app.onnx_encoder import OnnxEncoder
+
+        cls.encoder = OnnxEncoder(MODEL_PATH)
+
+    def test_batch_keeps_input_order(self):
+        sentences = ["dose", "what are the side effects of ibuprofen", "sleep aid", "asthma inhaler for children"]
+        batch = self.encoder.encode(sentences, batch_size=2)
+        one_by_one = np.stack([self.encoder.encode(s) for s in sentences])
+        self.assertEqual(batch.shape, (len(sentences), self.encoder.get_sentence_embedding_dimension()))
+        np.testing.assert_allclose(batch, one_by_one, atol=1e-4)
+
+    def test_vectors_are_unit_length(self):
+        vectors = self.encoder.encode(["migraine treatment", "eye drops for glaucoma"])
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+
+@unittest.skipUnless(HAS_ONNX and HAS_TORCH,
+                     "needs the ONNX export and sentence-transformers for the PyTorch reference")
+class OnnxParityTests(unittest.TestCase):
+    """The exported encoder must embed like the SentenceTransformer the index may have been built with."""
+
+    @classmethod
+    def setUpClass(cls):
+        from sentence_transformers import SentenceTransformer
+
+        from chatbot_api.app.onnx_encoder import OnnxEncoder
+        from chatbot_api.scripts.bench_encoder import SAMPLE_QUERIES
+
+        cls.encoder = OnnxEncoder(MODEL_PATH)
+        cls.reference = SentenceTransformer(cls.encoder.model_name, device="cpu")
+        cls.queries = SAMPLE_QUERIES
+        cls.passages = []
+        if os.path.exists(CORPUS_PATH):
+            with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+                cls.passages = [doc["text"] for doc in json.load(f)[:50] if doc.get("text")]
+
+    def embed(self, sentences):
+        onnx = self.encoder.encode(sentences)
+        torch = np.asarray(self.reference.encode(sentences, normalize_embeddings=True), dtype="float32")
+        return onnx, torch
+
+    def test_embeddings_match_pytorch(self):
+        onnx, torch = self.embed(self.queries + self.passages)
+        cosine = np.sum(onnx * torch, axis=1)
+        self.assertGreaterEqual(cosine.mean(), MIN_MEAN_COSINE)
+        self.assertGreaterEqual(cosine.min(), MIN_COSINE)
+
+    def test_queries_find_the_same_passages(self):
+        if not self.passages:
+            self.skipTest(f"no corpus at {CORPUS_PATH}")
+        onnx_queries, torch_queries = self.embed(self.queries)
+        _, torch_passages = self.embed(self.passages)
+        # An index built with PyTorch, searched with ONNX query vectors
+        found = np.argmax(onnx_queries @ torch_passages.T, axis=1)
+        expected = np.argmax(torch_queries @ torch_passages.T, axis=1)
+        self.assertGreaterEqual(np.mean(found == expected), 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()